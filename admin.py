@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from models import User
+from models import User, Comment, ProblemStatusHistory
 from database import get_db
-from auth import get_current_user, hash_password
+from auth import get_current_user, hash_password, invalidate_user
 from schemas import UserCreate
+from response_cache import invalidate
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
@@ -33,6 +34,18 @@ def delete_user(user_id: int, db: Session = Depends(get_db), current_user: User
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    db.delete(user)
+
+    # povijest statusa je audit trag, ne briše se zajedno s adminom
+    if db.query(ProblemStatusHistory.id).filter(ProblemStatusHistory.changed_by == user_id).first():
+        raise HTTPException(
+            status_code=409,
+            detail="User has status changes in problem history and cannot be deleted"
+        )
+
+    username = user.username
+    commented = [pid for (pid,) in db.query(Comment.problem_id).filter(Comment.user_id == user_id).distinct()]
+    db.delete(user)   # komentari, glasovi, notifikacije i spremljeni idu kaskadno
     db.commit()
+    invalidate_user(username)
+    invalidate(*(f"comments:{pid}" for pid in commented))
     return {"message": "User deleted"}
@@ -1,11 +1,17 @@
 import os
+import threading
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import jwt, JWTError
 from models import User
-from database import get_db
+from database import get_read_db, get_async_read_db
+from ttl_cache import TTLCache
 
 SECRET_KEY = os.getenv("SECRET_KEY", "fallback_key")
 ALGORITHM = "HS256"
@@ -21,7 +27,41 @@ def create_access_token(data: dict):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+# --------------------------
+# CACHE ZA AUTENTIFIKACIJU
+# --------------------------
+# Dekodirani tokeni i osnovni podaci korisnika drže se u memoriji procesa
+# da cheap endpointi (vote, mark-read) ne rade SELECT na users svaki put.
+# Brisanje ili promjena admin statusa mora pozvati invalidate_user().
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+
+
+@dataclass(frozen=True)
+class AuthUser:
+    id: int
+    username: str
+    is_admin: int
+
+
+_token_cache = TTLCache(USER_CACHE_SIZE)  # token -> username
+_user_cache = TTLCache(USER_CACHE_SIZE)   # username -> AuthUser
+
+
+def invalidate_user(username: str | None = None):
+    """Briše korisnika iz cachea (ili cijeli cache ako username nije zadan)."""
+    if username is None:
+        _user_cache.clear()
+        _token_cache.clear()
+    else:
+        _user_cache.pop(username)
+
+
+def _decode_username(token: str) -> str:
+    username = _token_cache.get(token) if USER_CACHE_TTL > 0 else None
+    if username is not None:
+        return username
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -30,18 +70,100 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
+    if USER_CACHE_TTL > 0:
+        # token ne smije ostati u cacheu nakon što istekne
+        ttl = min(USER_CACHE_TTL, payload.get("exp", 0) - time.time())
+        if ttl > 0:
+            _token_cache.set(token, username, ttl)
+    return username
+
+
+def _remember_user(username: str, row):
+    if not row:
         raise HTTPException(status_code=401, detail="User not found")
+
+    user = AuthUser(id=row.id, username=row.username, is_admin=row.is_admin)
+    if USER_CACHE_TTL > 0:
+        _user_cache.set(username, user, USER_CACHE_TTL)
     return user
 
 
-# password hashing
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_read_db)):
+    username = _decode_username(token)
+
+    user = _user_cache.get(username) if USER_CACHE_TTL > 0 else None
+    if user is not None:
+        return user
+
+    row = db.query(User.id, User.username, User.is_admin).filter(User.username == username).first()
+    return _remember_user(username, row)
+
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_read_db)):
+    """Isto kao get_current_user, za rute koje koriste AsyncSession."""
+    username = _decode_username(token)
+
+    user = _user_cache.get(username) if USER_CACHE_TTL > 0 else None
+    if user is not None:
+        return user
+
+    result = await db.execute(
+        select(User.id, User.username, User.is_admin).where(User.username == username)
+    )
+    return _remember_user(username, result.first())
+
+
+# --------------------------
+# PASSWORD HASHING
+# --------------------------
+# argon2 je namjerno skup, pa se izvršava na zasebnom, ograničenom poolu
+# umjesto u threadpoolu koji FastAPI koristi za sve sync endpointe.
+# Kad je red pun, zahtjev odmah dobiva 503 umjesto da čeka.
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", "2"))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", "16"))
+
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__time_cost=ARGON2_TIME_COST,
+    argon2__memory_cost=ARGON2_MEMORY_COST,
+    argon2__parallelism=ARGON2_PARALLELISM,
+)
+
+_hash_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="argon2")
+_hash_slots = threading.BoundedSemaphore(HASH_WORKERS + HASH_QUEUE_LIMIT)
+
+
+def _submit(fn, *args):
+    if not _hash_slots.acquire(blocking=False):
+        raise HTTPException(status_code=503, detail="Server is busy, try again")
+    future = _hash_pool.submit(fn, *args)
+    future.add_done_callback(lambda _: _hash_slots.release())
+    return future
+
 
 def hash_password(password: str):
-    return pwd_context.hash(password)
+    return _submit(pwd_context.hash, password).result()
 
 def verify_password(plain, hashed):
-    return pwd_context.verify(plain, hashed)
+    return _submit(pwd_context.verify, plain, hashed).result()
+
+
+async def hash_password_async(password: str):
+    return await asyncio.wrap_future(_submit(pwd_context.hash, password))
+
+
+async def verify_and_update_password(plain, hashed):
+    """
+    Provjerava lozinku; vraća (ok, novi_hash). novi_hash nije None kad je
+    spremljeni hash rađen sa starim parametrima pa ga treba zamijeniti.
+    """
+    return await asyncio.wrap_future(_submit(pwd_context.verify_and_update, plain, hashed))
@@ -0,0 +1,115 @@
+"""
+Benchmark: propusnost istog list upita preko sync Sessiona (FastAPI
+threadpool) i preko AsyncSessiona (aiosqlite) pri 200 istovremenih klijenata.
+
+    python benchmarks/bench_async_db.py [broj_zahtjeva] [konkurentnost]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker, joinedload
+
+from database import Base
+from models import Location, Problem, Status
+
+ROWS = 5000
+
+
+def build_app():
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+
+    Session = sessionmaker(bind=engine, autoflush=False)
+    AsyncSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    db = Session()
+    status = Status(name="open")
+    db.add(status)
+    db.flush()
+    for i in range(ROWS):
+        location = Location(latitude=43.5 + i * 1e-5, longitude=16.4, address="Split")
+        db.add(Problem(title=f"Problem {i}", description="opis", image_path="x.jpg",
+                       status_id=status.id, location=location))
+    db.commit()
+    db.close()
+
+    def get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db():
+        async with AsyncSession() as db:
+            yield db
+
+    def page_query():
+        return (
+            select(Problem)
+            .options(joinedload(Problem.status))
+            .order_by(Problem.created_at.desc(), Problem.id.desc())
+            .limit(20)
+        )
+
+    app = FastAPI()
+
+    @app.get("/sync/problems")
+    def sync_problems(db=Depends(get_db)):
+        return [{"id": p.id, "status": p.status.name} for p in db.scalars(page_query())]
+
+    @app.get("/async/problems")
+    async def async_problems(db=Depends(get_async_db)):
+        return [{"id": p.id, "status": p.status.name} for p in await db.scalars(page_query())]
+
+    return app
+
+
+async def run(app, path, n, concurrency):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        await client.get(path)
+        latencies = []
+
+        async def worker(count):
+            for _ in range(count):
+                start = time.perf_counter()
+                r = await client.get(path)
+                latencies.append(time.perf_counter() - start)
+                assert r.status_code == 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(n // concurrency) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(
+        f"{path:16} {len(latencies) / elapsed:7.0f} req/s  "
+        f"p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:7.1f} ms"
+    )
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    app = build_app()
+    print(f"{ROWS} problema, {concurrency} istovremenih klijenata, {n} zahtjeva")
+    asyncio.run(run(app, "/sync/problems", n, concurrency))
+    asyncio.run(run(app, "/async/problems", n, concurrency))
+
+
+if __name__ == "__main__":
+    main()
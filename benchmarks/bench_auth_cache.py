@@ -0,0 +1,91 @@
+"""
+Benchmark: zahtjevi u sekundi za autentificirani endpoint sa i bez
+cachea korisnika u auth.get_current_user.
+
+    python benchmarks/bench_auth_cache.py [broj_zahtjeva]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import auth
+from database import Base, get_read_db, count_queries
+from models import User
+
+
+def build_app():
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    db = Session()
+    db.add(User(username="bench", password="x", is_admin=0))
+    db.commit()
+    db.close()
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.dependency_overrides[get_read_db] = override_get_db
+
+    @app.get("/me")
+    def me(current_user=Depends(auth.get_current_user)):
+        return {"id": current_user.id}
+
+    return app, engine
+
+
+async def run(app, engine, headers, n, concurrency=20):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/me", headers=headers)  # zagrijavanje
+
+        async def worker(count):
+            for _ in range(count):
+                r = await client.get("/me", headers=headers)
+                assert r.status_code == 200
+
+        with count_queries(engine) as counter:
+            start = time.perf_counter()
+            await asyncio.gather(*(worker(n // concurrency) for _ in range(concurrency)))
+            elapsed = time.perf_counter() - start
+
+    done = (n // concurrency) * concurrency
+    return done / elapsed, counter["count"] / done
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    app, engine = build_app()
+    headers = {"Authorization": f"Bearer {auth.create_access_token({'sub': 'bench'})}"}
+
+    auth.USER_CACHE_TTL = 0
+    auth.invalidate_user()
+    before, before_q = asyncio.run(run(app, engine, headers, n))
+
+    auth.USER_CACHE_TTL = 60
+    auth.invalidate_user()
+    after, after_q = asyncio.run(run(app, engine, headers, n))
+
+    print(f"bez cachea: {before:8.0f} req/s  {before_q:.2f} SQL/req")
+    print(f"sa cacheom: {after:8.0f} req/s  {after_q:.2f} SQL/req")
+    print(f"ubrzanje:   {after / before:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark: bulk import N problema iz CSV-a (zadano 100k) u praznu bazu s
+istim triggerima kao produkcija (R*Tree, FTS, refcount slika) i klasterima.
+
+    python benchmarks/bench_import.py [broj_redaka] [batch_size]
+"""
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from bulk_import import IMPORT_BATCH_SIZE, import_problems
+from database import Base
+from fulltext import create_search_index
+from models import MapCluster, Problem, Status
+from spatial import create_spatial_index
+from storage import create_blob_refcounts
+
+
+def build_engine():
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    create_spatial_index(engine)
+    create_search_index(engine)
+    create_blob_refcounts(engine)
+    with Session(engine) as db:
+        db.add_all(Status(name=name) for name in ("open", "pending", "resolved"))
+        db.commit()
+    return engine
+
+
+def build_csv(n):
+    rnd = random.Random(42)
+    out = io.StringIO()
+    out.write("title,description,latitude,longitude,address,status,created_at\n")
+    for i in range(n):
+        out.write(
+            f"Problem {i},Rupa na cesti kod kućnog broja {i},"
+            f"{45.75 + rnd.random() * 0.1:.6f},{15.9 + rnd.random() * 0.1:.6f},"
+            f"Ilica {i % 300},{rnd.choice(('open', 'pending', 'resolved'))},"
+            f"2023-0{1 + i % 9}-1{i % 10}T08:00:00\n"
+        )
+    out.seek(0)
+    return out
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else IMPORT_BATCH_SIZE
+    engine = build_engine()
+    stream = build_csv(n)
+
+    start = time.perf_counter()
+    report = import_problems(stream, "csv", bind=engine, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+
+    with engine.connect() as conn:
+        problems = conn.scalar(select(func.count(Problem.id)))
+        clustered = conn.scalar(select(func.sum(MapCluster.count)).where(MapCluster.zoom == 0))
+    assert report["inserted"] == problems == clustered == n, (report, problems, clustered)
+
+    print(f"{n} redaka, batch {batch_size}: {elapsed:.1f} s ({n / elapsed:,.0f} redaka/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark: propusnost logina i latencija ostalih sync endpointa za vrijeme
+navale logina, kad se argon2 radi u FastAPI threadpoolu (staro ponašanje)
+i kad ide na zasebni ograničeni pool (auth.verify_and_update_password).
+
+    python benchmarks/bench_login.py [broj_logina] [konkurentnost]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# manji memory cost da benchmark ne zauzme gigabajte RAM-a; može se pregaziti
+os.environ.setdefault("ARGON2_MEMORY_COST", "19456")
+
+import httpx
+from fastapi import FastAPI
+
+import auth
+
+PASSWORD = "benchmark-password"
+HASH = auth.pwd_context.hash(PASSWORD)
+
+app = FastAPI()
+
+
+@app.post("/login-inline")
+def login_inline():
+    return {"ok": auth.pwd_context.verify(PASSWORD, HASH)}
+
+
+@app.post("/login-pool")
+async def login_pool():
+    valid, _ = await auth.verify_and_update_password(PASSWORD, HASH)
+    return {"ok": valid}
+
+
+@app.get("/ping")
+def ping():
+    return {}
+
+
+async def run(path, n, concurrency):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        statuses = []
+        ping_latencies = []
+        done = asyncio.Event()
+
+        async def login_worker(count):
+            for _ in range(count):
+                r = await client.post(path)
+                statuses.append(r.status_code)
+
+        async def pinger():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/ping")
+                ping_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.005)
+
+        ping_task = asyncio.create_task(pinger())
+        start = time.perf_counter()
+        await asyncio.gather(*(login_worker(n // concurrency) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await ping_task
+
+    ok = statuses.count(200)
+    ping_latencies.sort()
+    p99 = ping_latencies[int(len(ping_latencies) * 0.99) - 1] if ping_latencies else 0
+    print(
+        f"{path:14} {ok / elapsed:7.1f} login/s  503: {statuses.count(503):4}  "
+        f"ping p50 {statistics.median(ping_latencies) * 1000:7.1f} ms  p99 {p99 * 1000:7.1f} ms"
+    )
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    print(f"argon2 memory={auth.ARGON2_MEMORY_COST} KiB time={auth.ARGON2_TIME_COST}, "
+          f"pool={auth.HASH_WORKERS} workera + red {auth.HASH_QUEUE_LIMIT}")
+    asyncio.run(run("/login-inline", n, concurrency))
+    asyncio.run(run("/login-pool", n, concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark: serijalizacija liste problema na dva načina, za 1k i 10k stavki.
+
+  pydantic  ORM objekti -> response_model (list[ProblemResponse],
+            from_attributes) -> json.dumps, kao FastAPI kad endpoint vrati listu
+  orjson    SELECT stupaca -> dictovi -> orjson.dumps (serialization.py)
+
+Mjeri se upit + serijalizacija i samo serijalizacija.
+
+    python benchmarks/bench_serialization.py [ponavljanja]
+"""
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import joinedload, sessionmaker
+
+from database import Base
+from models import Problem, Status
+from schemas import ProblemResponse
+from serialization import PROBLEM_COLUMNS, problem_dicts
+
+SIZES = (1000, 10000)
+
+
+def build_db():
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    db = Session()
+    status = Status(name="open")
+    db.add(status)
+    db.flush()
+    db.add_all(
+        Problem(title=f"Problem {i}", description="Rupa na cesti kod semafora " * 3,
+                image_path=f"uploads/{i:02x}/{i:064x}.webp", status_id=status.id)
+        for i in range(max(SIZES))
+    )
+    db.commit()
+    db.close()
+    return Session
+
+
+adapter = TypeAdapter(list[ProblemResponse])
+
+
+def pydantic_serialize(problems):
+    data = adapter.dump_python(adapter.validate_python(problems, from_attributes=True), mode="json")
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def pydantic_path(db, n):
+    problems = db.scalars(
+        select(Problem).options(joinedload(Problem.status)).order_by(Problem.id).limit(n)
+    ).all()
+    return pydantic_serialize(problems)
+
+
+def orjson_path(db, n):
+    rows = db.execute(
+        select(*PROBLEM_COLUMNS).join(Status, Problem.status_id == Status.id).order_by(Problem.id).limit(n)
+    ).all()
+    return orjson.dumps(problem_dicts(rows))
+
+
+def timed(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    Session = build_db()
+
+    for n in SIZES:
+        db = Session()
+        assert json.loads(pydantic_path(db, n)) == json.loads(orjson_path(db, n))
+
+        problems = db.scalars(
+            select(Problem).options(joinedload(Problem.status)).order_by(Problem.id).limit(n)
+        ).all()
+        rows = db.execute(
+            select(*PROBLEM_COLUMNS).join(Status, Problem.status_id == Status.id).order_by(Problem.id).limit(n)
+        ).all()
+
+        full_pydantic = timed(lambda: (db.expunge_all(), pydantic_path(db, n)), repeats)
+        full_orjson = timed(lambda: orjson_path(db, n), repeats)
+        ser_pydantic = timed(lambda: pydantic_serialize(problems), repeats)
+        ser_orjson = timed(lambda: orjson.dumps(problem_dicts(rows)), repeats)
+        db.close()
+
+        print(f"{n:6} stavki  upit+serijalizacija: pydantic {full_pydantic:7.1f} ms  "
+              f"orjson {full_orjson:7.1f} ms  ({full_pydantic / full_orjson:4.1f}x)")
+        print(f"{'':14}samo serijalizacija: pydantic {ser_pydantic:7.1f} ms  "
+              f"orjson {ser_orjson:7.1f} ms  ({ser_pydantic / ser_orjson:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
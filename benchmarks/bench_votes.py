@@ -0,0 +1,101 @@
+"""
+Benchmark: glasova u sekundi kroz pravi /problems/{id}/vote endpoint kad
+svaki zahtjev radi svoj commit (write_queue nije pokrenut) i kad glasovi
+idu kroz write_queue s group commitom.
+
+    python benchmarks/bench_votes.py [broj_glasova] [konkurentnost]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# production profil (WAL, jedna writer konekcija) na privremenoj bazi
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+import httpx
+from fastapi import FastAPI, Header
+
+import auth
+from counters import create_vote_counter
+from database import Base, SessionLocal, engine
+from models import Problem, Status, User
+from routers.votes import router as votes_router
+from write_queue import write_queue
+
+USERS = 1000
+PROBLEMS = 20
+
+
+def build_app():
+    Base.metadata.create_all(bind=engine)
+    create_vote_counter(engine)
+
+    db = SessionLocal()
+    status = Status(name="open")
+    db.add(status)
+    db.add_all(User(username=f"user{i}", password="x", is_admin=0) for i in range(USERS))
+    db.flush()
+    db.add_all(
+        Problem(title=f"Problem {i}", description="opis", image_path="x.jpg", status_id=status.id)
+        for i in range(PROBLEMS * 2)
+    )
+    db.commit()
+    db.close()
+
+    def fake_user(x_user: int = Header()):
+        return auth.AuthUser(id=x_user, username=f"user{x_user}", is_admin=0)
+
+    app = FastAPI()
+    app.include_router(votes_router)
+    app.dependency_overrides[auth.get_current_user_async] = fake_user
+    return app
+
+
+async def run(app, label, first_problem, n, concurrency):
+    # svaki (korisnik, problem) par glasa jednom; druga runda koristi druge probleme
+    pairs = [(1 + i % USERS, first_problem + i // USERS) for i in range(n)]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        latencies = []
+        statuses = []
+
+        async def worker(chunk):
+            for user_id, problem_id in chunk:
+                start = time.perf_counter()
+                r = await client.post(f"/problems/{problem_id}/vote", headers={"x-user": str(user_id)})
+                latencies.append(time.perf_counter() - start)
+                statuses.append(r.status_code)
+
+        if label == "group commit":
+            write_queue.start()
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(pairs[i::concurrency]) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        await write_queue.stop()
+
+    latencies.sort()
+    print(
+        f"{label:14} {statuses.count(200) / elapsed:7.0f} glasova/s  greške: {len(statuses) - statuses.count(200):3}  "
+        f"p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:7.1f} ms"
+    )
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    n = min(n, USERS * PROBLEMS)
+    app = build_app()
+    print(f"{n} glasova, {concurrency} istovremenih klijenata, "
+          f"grupa do {write_queue.max_ops} operacija / {write_queue.window * 1000:.0f} ms")
+    asyncio.run(run(app, "commit po glasu", 1, n, concurrency))
+    asyncio.run(run(app, "group commit", 1 + PROBLEMS, n, concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Bulk import problema iz starog gradskog sustava (CSV, NDJSON, GeoJSON).
+
+    python bulk_import.py prijave.csv [--format csv] [--user admin] [--errors greske.ndjson]
+
+Polja zapisa: title, description, latitude, longitude, address, status
+(ime, zadano "open"), created_at (ISO 8601), image_path. GeoJSON Point
+geometrija daje longitude/latitude, ostalo je u properties.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+
+from clusters import add_points_to_clusters
+from database import engine as default_engine
+from models import Location, Problem, Status, User
+from schemas import ProblemImportRow
+
+# Zapisi se čitaju kao stream i validiraju redom; valjani se skupljaju u
+# batch od IMPORT_BATCH_SIZE i upisuju jednim executemany za locations i
+# jednim za problems, u jednoj transakciji po batchu. Statusi se čitaju
+# jednom, a klasteri za kartu se zbrajaju po batchu. R*Tree, FTS i
+# refcount slika održavaju triggeri kao i kod običnog create_problem.
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "5000"))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+
+FORMATS = ("csv", "ndjson", "geojson")
+_EXTENSIONS = {
+    "csv": "csv",
+    "ndjson": "ndjson", "jsonl": "ndjson", "geojsonl": "ndjson",
+    "geojson": "geojson", "json": "geojson",
+}
+
+
+# ---------------------------
+# ČITANJE
+# ---------------------------
+# Svaki reader vraća (zapis, greška) po zapisu, da neispravan redak ne
+# prekine cijeli import.
+def _feature(feature):
+    record = dict(feature.get("properties") or {})
+    geometry = feature.get("geometry") or {}
+    if geometry.get("type") == "Point":
+        lng, lat = geometry["coordinates"][:2]
+        record.setdefault("longitude", lng)
+        record.setdefault("latitude", lat)
+    return record
+
+
+def read_csv(stream):
+    for row in csv.DictReader(stream):
+        yield {key.strip(): value for key, value in row.items() if key and value not in (None, "")}, None
+
+
+def read_ndjson(stream):
+    # i GeoJSON text sequence (jedan Feature po retku)
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield None, f"neispravan JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield None, "zapis mora biti JSON objekt"
+        elif record.get("type") == "Feature":
+            yield _feature(record), None
+        else:
+            yield record, None
+
+
+def read_geojson(stream):
+    # FeatureCollection je jedan JSON dokument pa se parsira odjednom;
+    # za velike datoteke koristiti GeoJSON sequence kroz --format ndjson
+    document = json.load(stream)
+    features = document.get("features", []) if document.get("type") == "FeatureCollection" else [document]
+    for feature in features:
+        yield _feature(feature), None
+
+
+READERS = {"csv": read_csv, "ndjson": read_ndjson, "geojson": read_geojson}
+
+
+def detect_format(filename: str | None):
+    ext = (filename or "").rsplit(".", 1)[-1].lower()
+    return _EXTENSIONS.get(ext)
+
+
+# ---------------------------
+# UPIS
+# ---------------------------
+def _format_errors(exc: ValidationError):
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in exc.errors()
+    )
+
+
+def _utc(value, default):
+    if value is None:
+        return default
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _insert_batch(bind, rows, statuses, user_id, now):
+    with bind.begin() as conn:
+        location_ids = conn.execute(
+            insert(Location).returning(Location.id, sort_by_parameter_order=True),
+            [{"latitude": r.latitude, "longitude": r.longitude, "address": r.address} for r in rows],
+        ).scalars().all()
+
+        conn.execute(insert(Problem), [
+            {
+                "title": r.title,
+                "description": r.description,
+                "image_path": r.image_path,
+                "created_at": _utc(r.created_at, now),
+                "user_id": user_id,
+                "location_id": location_id,
+                "status_id": statuses[r.status],
+                "vote_count": 0,
+            }
+            for r, location_id in zip(rows, location_ids)
+        ])
+
+        add_points_to_clusters(conn, [
+            (r.latitude, r.longitude, statuses[r.status])
+            for r in rows
+            if r.latitude is not None and r.longitude is not None
+        ])
+
+
+def import_problems(stream, fmt: str, user_id: int | None = None, bind=default_engine,
+                    batch_size: int = IMPORT_BATCH_SIZE, max_errors: int = IMPORT_MAX_ERRORS):
+    """
+    Uvozi probleme iz tekstualnog streama. Vraća izvještaj:
+    {"inserted", "failed", "errors": [{"row", "error"}], "errors_truncated"}.
+    Redovi se broje od 1, bez CSV zaglavlja.
+    """
+    with bind.connect() as conn:
+        statuses = dict(conn.execute(select(Status.name, Status.id)).all())
+
+    now = datetime.utcnow().replace(microsecond=0)
+    report = {"inserted": 0, "failed": 0, "errors": [], "errors_truncated": False}
+    batch = []
+
+    def fail(number, error):
+        report["failed"] += 1
+        if len(report["errors"]) < max_errors:
+            report["errors"].append({"row": number, "error": error})
+        else:
+            report["errors_truncated"] = True
+
+    for number, (record, error) in enumerate(READERS[fmt](stream), start=1):
+        if error is not None:
+            fail(number, error)
+            continue
+        try:
+            row = ProblemImportRow.model_validate(record)
+        except ValidationError as e:
+            fail(number, _format_errors(e))
+            continue
+        if row.status not in statuses:
+            fail(number, f"status: nepoznat status '{row.status}'")
+            continue
+
+        batch.append(row)
+        if len(batch) >= batch_size:
+            _insert_batch(bind, batch, statuses, user_id, now)
+            report["inserted"] += len(batch)
+            batch = []
+
+    if batch:
+        _insert_batch(bind, batch, statuses, user_id, now)
+        report["inserted"] += len(batch)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import problema (CSV, NDJSON, GeoJSON)")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS, help="zadano prema ekstenziji datoteke")
+    parser.add_argument("--user", help="username vlasnika uvezenih problema")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument("--errors", help="zapiši sve greške kao NDJSON u ovu datoteku")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or detect_format(args.path)
+    if fmt is None:
+        parser.error("nepoznat format, zadaj --format")
+
+    user_id = None
+    if args.user:
+        with default_engine.connect() as conn:
+            user_id = conn.scalar(select(User.id).where(User.username == args.user))
+        if user_id is None:
+            parser.error(f"korisnik '{args.user}' ne postoji")
+
+    max_errors = sys.maxsize if args.errors else IMPORT_MAX_ERRORS
+    with open(args.path, encoding="utf-8-sig", newline="") as stream:
+        report = import_problems(stream, fmt, user_id, batch_size=args.batch_size, max_errors=max_errors)
+
+    if args.errors:
+        with open(args.errors, "w", encoding="utf-8") as out:
+            for error in report["errors"]:
+                out.write(json.dumps(error, ensure_ascii=False) + "\n")
+    else:
+        for error in report["errors"][:20]:
+            print(f"  redak {error['row']}: {error['error']}", file=sys.stderr)
+
+    print(f"✅ uvezeno {report['inserted']} problema, {report['failed']} neispravnih redaka")
+
+
+if __name__ == "__main__":
+    main()
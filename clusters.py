@@ -0,0 +1,121 @@
+import math
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from models import MapCluster, Problem, Location
+
+# klasteri se drže za zoom 0..MAX_CLUSTER_ZOOM; iznad toga klijent
+# ionako dohvaća pojedinačne točke preko /map/problems
+MAX_CLUSTER_ZOOM = 16
+
+
+def _coords(location):
+    if location is None or location.latitude in (None, "") or location.longitude in (None, ""):
+        return None
+    return float(location.latitude), float(location.longitude)
+
+
+def tile_for(lat: float, lng: float, zoom: int):
+    """Web Mercator (slippy map) tile koordinate za danu točku."""
+    n = 2 ** zoom
+    lat = max(min(lat, 85.0511), -85.0511)
+    x = int((lng + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def _apply(db: Session, lat: float, lng: float, status_id: int, delta: int):
+    rows = []
+    for zoom in range(MAX_CLUSTER_ZOOM + 1):
+        x, y = tile_for(lat, lng, zoom)
+        rows.append({
+            "zoom": zoom,
+            "tile_x": x,
+            "tile_y": y,
+            "status_id": status_id,
+            "count": delta,
+            "lat_sum": lat * delta,
+            "lng_sum": lng * delta,
+        })
+    _upsert(db, rows)
+
+
+def add_points_to_clusters(db, points):
+    """
+    Dodaje više točaka (lat, lng, status_id) odjednom: zbraja ih po tileu
+    pa radi jedan upsert po tileu umjesto po točki (za bulk import).
+    """
+    tiles = {}
+    for lat, lng, status_id in points:
+        for zoom in range(MAX_CLUSTER_ZOOM + 1):
+            x, y = tile_for(lat, lng, zoom)
+            tile = tiles.setdefault((zoom, x, y, status_id), [0, 0.0, 0.0])
+            tile[0] += 1
+            tile[1] += lat
+            tile[2] += lng
+    if tiles:
+        _upsert(db, [
+            {"zoom": zoom, "tile_x": x, "tile_y": y, "status_id": status_id,
+             "count": count, "lat_sum": lat_sum, "lng_sum": lng_sum}
+            for (zoom, x, y, status_id), (count, lat_sum, lng_sum) in tiles.items()
+        ])
+
+
+def _upsert(db, rows):
+    stmt = insert(MapCluster)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["zoom", "tile_x", "tile_y", "status_id"],
+        set_={
+            "count": MapCluster.count + stmt.excluded.count,
+            "lat_sum": MapCluster.lat_sum + stmt.excluded.lat_sum,
+            "lng_sum": MapCluster.lng_sum + stmt.excluded.lng_sum,
+        },
+    )
+    db.execute(stmt, rows)
+
+
+def add_to_clusters(db: Session, problem: Problem, location: Location | None = None):
+    """Dodaje problem u klastere. Poziva se u istoj transakciji kao i upis problema."""
+    coords = _coords(location if location is not None else problem.location)
+    if coords and problem.status_id is not None:
+        _apply(db, *coords, problem.status_id, 1)
+
+
+def remove_from_clusters(db: Session, problem: Problem, status_id: int | None = None,
+                         location: Location | None = None):
+    """
+    Miče problem iz klastera. Kod promjene statusa ili lokacije treba
+    proslijediti STARI status_id / lokaciju, a zatim pozvati add_to_clusters.
+    """
+    coords = _coords(location if location is not None else problem.location)
+    status_id = status_id if status_id is not None else problem.status_id
+    if coords and status_id is not None:
+        _apply(db, *coords, status_id, -1)
+
+
+def rebuild_clusters(db: Session):
+    """Ponovno izračunava sve klastere iz tablica problems i locations."""
+    db.query(MapCluster).delete()
+    rows = (
+        db.query(Location.latitude, Location.longitude, Problem.status_id)
+        .join(Problem, Problem.location_id == Location.id)
+        .filter(Problem.status_id.isnot(None))
+        .all()
+    )
+    for lat, lng, status_id in rows:
+        if lat in (None, "") or lng in (None, ""):
+            continue
+        _apply(db, float(lat), float(lng), status_id, 1)
+    db.query(MapCluster).filter(MapCluster.count <= 0).delete()
+    db.commit()
+
+
+def ensure_clusters(engine):
+    """Kod startupa puni map_clusters ako je tablica prazna, a problemi postoje."""
+    db = Session(bind=engine)
+    try:
+        empty = db.query(func.count(MapCluster.zoom)).scalar() == 0
+        if empty and db.query(Problem.id).filter(Problem.location_id.isnot(None)).first():
+            rebuild_clusters(db)
+    finally:
+        db.close()
@@ -0,0 +1,134 @@
+from sqlalchemy import text
+from database import engine as default_engine
+
+# Problem.vote_count se održava triggerima na problem_votes, pa je uvijek
+# u istoj transakciji kao i insert/delete glasa (uključujući cascade
+# brisanja kod brisanja korisnika ili problema).
+VOTE_COUNTER_DDL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS problem_votes_count_insert
+    AFTER INSERT ON problem_votes
+    BEGIN
+        UPDATE problems SET vote_count = vote_count + 1 WHERE id = new.problem_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS problem_votes_count_delete
+    AFTER DELETE ON problem_votes
+    BEGIN
+        UPDATE problems SET vote_count = vote_count - 1 WHERE id = old.problem_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS problem_votes_count_update
+    AFTER UPDATE OF problem_id ON problem_votes
+    BEGIN
+        UPDATE problems SET vote_count = vote_count - 1 WHERE id = old.problem_id;
+        UPDATE problems SET vote_count = vote_count + 1 WHERE id = new.problem_id;
+    END
+    """,
+]
+
+
+def _recount(conn):
+    return conn.execute(text(
+        """
+        UPDATE problems SET vote_count = (
+            SELECT COUNT(*) FROM problem_votes WHERE problem_votes.problem_id = problems.id
+        )
+        WHERE vote_count IS NOT (
+            SELECT COUNT(*) FROM problem_votes WHERE problem_votes.problem_id = problems.id
+        )
+        """
+    )).rowcount
+
+
+def create_vote_counter(engine):
+    """Kreira triggere; kod prvog kreiranja preračunava vote_count postojećih problema."""
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'problem_votes_count_insert'")
+        ).first()
+
+        for ddl in VOTE_COUNTER_DDL:
+            conn.execute(text(ddl))
+
+        if not exists:
+            _recount(conn)
+
+
+def recount_votes(engine=default_engine):
+    """Popravlja vote_count iz problem_votes. Vraća broj ispravljenih problema."""
+    with engine.begin() as conn:
+        return _recount(conn)
+
+
+# ---------------------------
+# NEPROČITANE NOTIFIKACIJE
+# ---------------------------
+# User.unread_notifications se održava isto tako, pa je brojač na zvonu
+# jedan lookup po primarnom ključu umjesto COUNT-a po notifikacijama.
+_UNREAD = "COALESCE({row}.is_read, 0) = 0"
+
+NOTIFICATION_COUNTER_DDL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS notifications_unread_insert
+    AFTER INSERT ON notifications
+    WHEN {_UNREAD.format(row="new")}
+    BEGIN
+        UPDATE users SET unread_notifications = unread_notifications + 1 WHERE id = new.user_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS notifications_unread_delete
+    AFTER DELETE ON notifications
+    WHEN {_UNREAD.format(row="old")}
+    BEGIN
+        UPDATE users SET unread_notifications = unread_notifications - 1 WHERE id = old.user_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS notifications_unread_update
+    AFTER UPDATE OF is_read, user_id ON notifications
+    BEGIN
+        UPDATE users SET unread_notifications = unread_notifications - 1
+        WHERE id = old.user_id AND {_UNREAD.format(row="old")};
+        UPDATE users SET unread_notifications = unread_notifications + 1
+        WHERE id = new.user_id AND {_UNREAD.format(row="new")};
+    END
+    """,
+]
+
+
+def _recount_unread(conn):
+    count = f"SELECT COUNT(*) FROM notifications WHERE user_id = users.id AND {_UNREAD.format(row='notifications')}"
+    return conn.execute(text(
+        f"UPDATE users SET unread_notifications = ({count}) WHERE unread_notifications IS NOT ({count})"
+    )).rowcount
+
+
+def create_notification_counter(engine):
+    """Kreira triggere; kod prvog kreiranja preračunava brojače postojećih korisnika."""
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'notifications_unread_insert'")
+        ).first()
+
+        for ddl in NOTIFICATION_COUNTER_DDL:
+            conn.execute(text(ddl))
+
+        if not exists:
+            _recount_unread(conn)
+
+
+def recount_unread(engine=default_engine):
+    """Popravlja unread_notifications. Vraća broj ispravljenih korisnika."""
+    with engine.begin() as conn:
+        return _recount_unread(conn)
+
+
+if __name__ == "__main__":
+    fixed = recount_votes()
+    print(f"✅ vote_count ispravljen za {fixed} problema")
+    fixed = recount_unread()
+    print(f"✅ unread_notifications ispravljen za {fixed} korisnika")
@@ -1,24 +1,225 @@
-from sqlalchemy import create_engine
+import os
+from contextlib import contextmanager
+from fastapi import Request
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
-DATABASE_URL = "sqlite:///./repair_map.db"
-
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}  # SQLite zahtijeva ovo
+# ---------------------------
+# KONFIGURACIJA (env varijable)
+# ---------------------------
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./repair_map.db")
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL",
+    DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
 )
 
+# "production" uključuje WAL i pragme ispod te odvaja read-only pool za
+# GET rute od writer konekcija; "default" je goli SQLite kao prije.
+#
+# Writer konekcije su DVIJE, po jedna u sync i async engineu (pool_size=1):
+#  - async: hot rute i write queue (group commit), BEGIN IMMEDIATE
+#  - sync: admin rute, /register, bulk import, retencija, dnevni sažeci,
+#    GC slika i startup (ensure_clusters, triggeri)
+# Unutar jednog enginea upisi idu redom kroz tu jednu konekciju, a između
+# njih ih serijalizira tek SQLite write lock: sync upis čeka async (i
+# obrnuto) najviše busy_timeout ms, pa onda dobiva "database is locked".
+# Dugi sync upisi (bulk import, retencija) zato idu u kratkim batchevima.
+DB_PROFILE = os.getenv("DB_PROFILE", "production")
+
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),  # negativno = KiB
+    "foreign_keys": os.getenv("SQLITE_FOREIGN_KEYS", "ON"),
+}
+READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "8"))
+
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+SPLIT_READS = IS_SQLITE and DB_PROFILE == "production"
+
+
+def _apply_pragmas(sync_engine, read_only=False):
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only = ON")
+        cursor.close()
+
+
+def _make_engines(url, factory, poolclass, **kwargs):
+    """Vraća (writer, reader) par enginea za dani URL."""
+    if IS_SQLITE:
+        kwargs["connect_args"] = {"check_same_thread": False}  # SQLite zahtijeva ovo
+
+    if not SPLIT_READS:
+        writer = factory(url, **kwargs)
+        return writer, writer
+
+    # jedna writer konekcija po engineu serijalizira upise tog enginea
+    # (vidi gore: sync i async writer dijele samo SQLite write lock)
+    writer = factory(url, poolclass=poolclass, pool_size=1, max_overflow=0, **kwargs)
+    reader = factory(url, poolclass=poolclass, pool_size=READ_POOL_SIZE,
+                     max_overflow=READ_POOL_SIZE, **kwargs)
+
+    _apply_pragmas(getattr(writer, "sync_engine", writer))
+    _apply_pragmas(getattr(reader, "sync_engine", reader), read_only=True)
+    return writer, reader
+
+
+engine, read_engine = _make_engines(DATABASE_URL, create_engine, QueuePool)
+
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
     bind=engine
 )
+ReadSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=read_engine
+)
+
+# async engine za hot rute (problems, votes, comments, notifications, map);
+# expire_on_commit=False jer se u async kodu ne smije lazy-loadati
+async_engine, async_read_engine = _make_engines(
+    ASYNC_DATABASE_URL, create_async_engine, AsyncAdaptedQueuePool
+)
+
+
+def enable_sqlite_savepoints(sync_engine, begin="BEGIN"):
+    """
+    pysqlite/aiosqlite sami otvaraju transakciju tek prije DML-a, pa
+    SAVEPOINT ne radi ispravno. Ovo je recept iz SQLAlchemy dokumentacije:
+    driver ne dira transakcije, a BEGIN šaljemo sami. Treba ga write queue
+    (svaka operacija u grupi ima svoj SAVEPOINT).
+    """
+    @event.listens_for(sync_engine, "connect")
+    def disable_driver_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(sync_engine, "begin")
+    def emit_begin(conn):
+        conn.exec_driver_sql(begin)
+
+
+if IS_SQLITE:
+    # writer odmah uzima write lock, tako da čitanje pa upis u istoj
+    # transakciji ne završi sa SQLITE_BUSY kad je netko drugi upisao između
+    enable_sqlite_savepoints(
+        async_engine.sync_engine, "BEGIN IMMEDIATE" if SPLIT_READS else "BEGIN"
+    )
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
+AsyncReadSessionLocal = async_sessionmaker(
+    async_read_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# svi sync engine objekti (za event hookove: metrike, brojanje upita)
+ALL_ENGINES = list({
+    id(e): e for e in (engine, read_engine, async_engine.sync_engine, async_read_engine.sync_engine)
+}.values())
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+def get_db(request: Request = None):
+    # GET rute čitaju iz read-only poola, sve ostalo ide na writer
+    if request is not None and request.method == "GET":
+        db = ReadSessionLocal()
+    else:
+        db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db(request: Request = None):
+    factory = AsyncReadSessionLocal if request is not None and request.method == "GET" else AsyncSessionLocal
+    async with factory() as db:
+        yield db
+
+
+def get_read_db():
+    # uvijek read-only pool, i za POST rute koje pišu kroz write queue
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
+def upgrade_schema(bind):
+    """
+    create_all ne dira postojeće tablice, pa ovdje dodajemo stupce i
+    indekse koji su naknadno dodani u models.py.
+    """
+    with bind.begin() as conn:
+        # inspector na istoj konekciji, writer pool ima samo jednu
+        inspector = inspect(conn)
+        existing_tables = set(inspector.get_table_names())
+
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(bind.dialect)}"
+                default = getattr(column.server_default, "arg", None)
+                if isinstance(default, str):
+                    ddl += f" DEFAULT '{default}'"
+                # SQLite dopušta REFERENCES u ADD COLUMN samo uz DEFAULT NULL
+                for fk in column.foreign_keys if default is None else ():
+                    ddl += f" REFERENCES {fk.column.table.name}({fk.column.name})"
+                    if fk.ondelete:
+                        ddl += f" ON DELETE {fk.ondelete}"
+                conn.execute(text(ddl))
+
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+
+@contextmanager
+def count_queries(bind=None):
+    """
+    Broji SQL naredbe izvršene unutar bloka (na svim engineima ako bind
+    nije zadan), npr. za provjeru budžeta upita:
+
+        with count_queries() as counter:
+            client.get("/saved/")
+        assert counter["count"] <= 3, counter["statements"]
+    """
+    counter = {"count": 0, "statements": []}
+    binds = [bind] if bind is not None else ALL_ENGINES
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter["count"] += 1
+        counter["statements"].append(statement)
+
+    for b in binds:
+        event.listen(b, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        for b in binds:
+            event.remove(b, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,117 @@
+import re
+from sqlalchemy import text, table, column, literal_column, func
+
+# FTS5 indeks nad problems(title, description) kao external-content tablica:
+# tekst se ne duplicira, triggeri na "problems" drže indeks usklađenim.
+# unicode61 s remove_diacritics 2 svodi č/ć/š/ž na c/s/z; đ nema
+# dekompoziciju pa ga sami pretvaramo u "dj" (i kod indeksiranja i u upitu).
+problems_fts = table("problems_fts", column("rowid"))
+
+# naslov nosi više težine od opisa kod BM25 rangiranja
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+
+def _fold_sql(expr: str) -> str:
+    return f"replace(replace({expr}, 'đ', 'dj'), 'Đ', 'Dj')"
+
+
+def _fts_row(row: str) -> str:
+    return f"{row}.id, {_fold_sql(row + '.title')}, {_fold_sql(row + '.description')}"
+
+
+FULLTEXT_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS problems_fts USING fts5(
+        title, description,
+        content='problems', content_rowid='id',
+        tokenize="unicode61 remove_diacritics 2",
+        prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS problems_fts_insert
+    AFTER INSERT ON problems
+    BEGIN
+        INSERT INTO problems_fts(rowid, title, description)
+        VALUES ({_fts_row("new")});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS problems_fts_delete
+    AFTER DELETE ON problems
+    BEGIN
+        INSERT INTO problems_fts(problems_fts, rowid, title, description)
+        VALUES ('delete', {_fts_row("old")});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS problems_fts_update
+    AFTER UPDATE OF title, description ON problems
+    BEGIN
+        INSERT INTO problems_fts(problems_fts, rowid, title, description)
+        VALUES ('delete', {_fts_row("old")});
+        INSERT INTO problems_fts(rowid, title, description)
+        VALUES ({_fts_row("new")});
+    END
+    """,
+]
+
+
+def _fill_index(conn):
+    conn.execute(text(
+        "INSERT INTO problems_fts(rowid, title, description) "
+        f"SELECT {_fts_row('problems')} FROM problems"
+    ))
+
+
+def create_search_index(engine):
+    """Kreira FTS5 indeks i triggere; kod prvog kreiranja indeksira postojeće probleme."""
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'problems_fts'")
+        ).first()
+
+        for ddl in FULLTEXT_DDL:
+            conn.execute(text(ddl))
+
+        if not exists:
+            _fill_index(conn)
+
+
+def rebuild_search_index(engine):
+    """Ponovno gradi FTS indeks iz tablice problems (npr. nakon ručnih izmjena baze)."""
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO problems_fts(problems_fts) VALUES ('delete-all')"))
+        _fill_index(conn)
+
+
+def build_match_query(search: str) -> str | None:
+    """
+    Pretvara korisnički unos u FTS5 MATCH izraz: svaka riječ je prefiks
+    ("rup cest" nalazi "rupa na cesti"). Vraća None ako nema riječi.
+    """
+    folded = search.replace("đ", "dj").replace("Đ", "Dj")
+    words = re.findall(r"\w+", folded)
+    if not words:
+        return None
+    return " ".join(f'"{w}"*' for w in words)
+
+
+def match_problems(query, id_col, search: str):
+    """Ograničava query na probleme koji odgovaraju pretrazi. Vraća (query, matched)."""
+    match = build_match_query(search)
+    if match is None:
+        return query, False
+
+    query = (
+        query
+        .join(problems_fts, problems_fts.c.rowid == id_col)
+        .filter(literal_column("problems_fts").op("MATCH")(match))
+    )
+    return query, True
+
+
+def bm25_rank():
+    """Rang za ORDER BY ... ASC (manji je relevantniji); koristiti uz match_problems."""
+    return func.bm25(literal_column("problems_fts"), TITLE_WEIGHT, DESCRIPTION_WEIGHT)
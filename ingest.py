@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import anyio
+from sqlalchemy import select, update
+
+import storage
+from database import AsyncReadSessionLocal
+from models import ImageBlob, Problem
+from response_cache import invalidate
+from storage import StoredUpload, blob_key, put_pinned, register_blob
+from write_queue import write_queue
+
+# ---------------------------
+# NORMALIZACIJA SLIKA
+# ---------------------------
+# Nakon create_problem original se u pozadini okreće prema EXIF orijentaciji,
+# čisti od metapodataka (i GPS-a), smanjuje na INGEST_MAX_SIDE i ponovno
+# kodira. Novi blob zamjenjuje original u svim problemima; original ostaje bez
+# reference pa ga briše storage.collect_garbage. Ako je red pun ili app
+# padne prije obrade, enqueue_pending() pokupi preostale kod sljedećeg starta.
+INGEST_MAX_SIDE = int(os.getenv("INGEST_MAX_SIDE", "2048"))
+INGEST_FORMAT = os.getenv("INGEST_FORMAT", "webp")   # webp ili jpeg
+INGEST_QUALITY = int(os.getenv("INGEST_QUALITY", "82"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_QUEUE_LIMIT = int(os.getenv("INGEST_QUEUE_LIMIT", "256"))
+
+_EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+
+log = logging.getLogger(__name__)
+
+
+def normalize_image(src: str, staging_dir: str, max_side: int = INGEST_MAX_SIDE,
+                    fmt: str = INGEST_FORMAT, quality: int = INGEST_QUALITY):
+    """
+    Izvršava se u worker procesu. Zapisuje normaliziranu sliku u staging_dir
+    i vraća (privremena_putanja, sha256, veličina).
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(src) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side))
+        if fmt == "jpeg" or image.mode not in ("RGB", "RGBA", "L"):
+            image = image.convert("RGBA" if fmt == "webp" and image.has_transparency_data else "RGB")
+
+        if fmt == "webp":
+            options = {"quality": quality, "method": 4}
+        else:
+            options = {"quality": quality, "optimize": True, "progressive": True}
+
+        tmp = os.path.join(staging_dir, f"{uuid.uuid4().hex}.part")
+        # exif se ne prenosi: Pillow ga zapisuje samo ako je zadan kod save()
+        image.save(tmp, format=fmt.upper(), **options)
+
+    digest = hashlib.sha256()
+    with open(tmp, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return tmp, digest.hexdigest(), os.path.getsize(tmp)
+
+
+class IngestQueue:
+    def __init__(self, workers=INGEST_WORKERS, queue_limit=INGEST_QUEUE_LIMIT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._queue = None
+        self._tasks = []
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return bool(self._tasks)
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_limit)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Prekida obradu; neobrađene slike ostaju originali do sljedećeg starta."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def submit(self, upload: StoredUpload) -> bool:
+        """Stavlja sliku u red za obradu. Vraća False ako red ne radi ili je pun."""
+        if not self.running:
+            return False
+        try:
+            self._queue.put_nowait(upload.key)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def enqueue_pending(self) -> int:
+        """Stavlja u red korištene slike koje još nisu normalizirane."""
+        if not self.running:
+            return 0
+        async with AsyncReadSessionLocal() as db:
+            keys = (await db.scalars(
+                select(ImageBlob.key)
+                .where(ImageBlob.normalized.is_(False), ImageBlob.refcount > 0)
+                .limit(self.queue_limit - self._queue.qsize())
+            )).all()
+        for key in keys:
+            self._queue.put_nowait(key)
+        return len(keys)
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    async def _worker(self):
+        while True:
+            key = await self._queue.get()
+            try:
+                await self.process(key)
+            except Exception:
+                log.exception("Image normalization failed for %s", key)
+
+    async def process(self, key: str):
+        """Normalizira blob `key` i prebacuje sve probleme koji ga koriste na novi."""
+        store = storage.backend
+        tmp, sha256, size = await asyncio.get_running_loop().run_in_executor(
+            self._executor(), normalize_image, store.public_path(key), store.staging_dir
+        )
+        new_key = blob_key(sha256, _EXTENSIONS[INGEST_FORMAT])
+        new_path = store.public_path(new_key)
+        created = await anyio.to_thread.run_sync(
+            put_pinned, store, tmp, new_key, new_path, size, True
+        )
+        normalized = StoredUpload(
+            key=new_key, path=new_path, size=size,
+            sha256=sha256, ext=_EXTENSIONS[INGEST_FORMAT], created=created,
+        )
+        old_path = store.public_path(key)
+
+        async def write(db):
+            await db.execute(register_blob(normalized, normalized=True))
+            # triggeri prebacuju refcount s originala na novi blob
+            by_path = await db.scalars(
+                update(Problem)
+                .where(Problem.image_path == old_path)
+                .values(image_path=normalized.path)
+                .returning(Problem.id)
+                .execution_options(synchronize_session=False)
+            )
+            changed = set(by_path.all())
+            by_url = await db.scalars(
+                update(Problem)
+                .where(Problem.image_url == key)
+                .values(image_url=normalized.key)
+                .returning(Problem.id)
+                .execution_options(synchronize_session=False)
+            )
+            return changed | set(by_url.all())
+
+        changed = await write_queue.submit(write)
+        if changed:
+            invalidate("problems", *(f"problem:{problem_id}" for problem_id in changed))
+
+
+ingest_queue = IngestQueue()
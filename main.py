@@ -3,21 +3,22 @@ from database import Base, engine, SessionLocal, get_db
 import schemas
 from models import User
 from sqlalchemy.orm import Session
-from fastapi.staticfiles import StaticFiles
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from passlib.context import CryptContext
-import shutil
 import os
 from fastapi.openapi.utils import get_openapi
-from auth import get_current_user
+from auth import get_current_user, invalidate_user
+from validators import validate_upload_file
+from storage import save_upload, register_blob, BodySizeLimitMiddleware, UploadStaticFiles
 
 app = FastAPI(
     title="Split Repair Map",
     version="0.1.0",
     description="API za prijavu komunalnih problema u Splitu"
 )
+app.add_middleware(BodySizeLimitMiddleware)
 
 SECRET_KEY = os.getenv("SECRET_KEY", "fallback_key")
 ALGORITHM = "HS256"
@@ -63,6 +64,7 @@ def create_initial_admin():
             if existing.is_admin != 1:
                 existing.is_admin = 1
                 db.commit()
+                invalidate_user(existing.username)
             return
 
         # stvori admin korisnika
@@ -133,11 +135,13 @@ def delete_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    username = user.username
     db.delete(user)
     db.commit()
+    invalidate_user(username)
     return {"message": "User deleted"}
 
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.mount("/uploads", UploadStaticFiles(directory="uploads"), name="uploads")
 
 
 # --------------------------
@@ -193,12 +197,8 @@ async def create_problem(
 ):
     user_id = current_user.id
 
-    upload_folder = "uploads"
-    os.makedirs(upload_folder, exist_ok=True)
-
-    file_location = f"{upload_folder}/{file.filename}"
-    with open(file_location, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    validate_upload_file(file)
+    upload = await save_upload(file)
 
     location = models.Location(
         latitude=latitude,
@@ -219,12 +219,13 @@ async def create_problem(
     problem = models.Problem(
         title=title,
         description=description,
-        image_path=file_location,
+        image_path=upload.path,
         location_id=location.id,
         status_id=status.id,
         user_id=user_id
     )
 
+    db.execute(register_blob(upload))
     db.add(problem)
     db.commit()
     db.refresh(problem)
@@ -1,26 +1,49 @@
-from fastapi import FastAPI, Depends, UploadFile, File, HTTPException
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, Depends, UploadFile, File, HTTPException, Query
 from fastapi.openapi.utils import get_openapi
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy import or_
-from sqlalchemy.orm import Session
+from sqlalchemy import select, type_coerce, String
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
 from routers.votes import router as votes_router
+import asyncio
 import os
-import shutil
 import schemas
 import models
 from models import User
-from database import Base, engine, get_db
+from database import Base, engine, get_db, get_async_db, ALL_ENGINES, upgrade_schema
+from spatial import create_spatial_index
+from fulltext import create_search_index, match_problems, bm25_rank
+from counters import create_vote_counter, create_notification_counter
+from ranking import update_trending, trending_refresher
+from retention import retention_job
+from clusters import add_to_clusters, ensure_clusters
+from write_queue import write_queue
+from response_cache import ResponseCacheMiddleware, invalidate
+from ingest import ingest_queue
+import notify
+from serialization import PROBLEM_COLUMNS, COMMENT_COLUMNS, problem_dicts, row_dicts
+from pagination import encode_cursor, decode_cursor, keyset_filter, cached_count
 from auth import (
     get_current_user,
-    hash_password,
-    verify_password,
+    get_current_user_async,
+    hash_password_async,
+    verify_and_update_password,
     create_access_token,
 )
 from validators import validate_upload_file
+from thumbnails import thumbnail_cache
+from storage import (
+    UPLOAD_FOLDER,
+    save_upload,
+    register_blob,
+    create_blob_refcounts,
+    BodySizeLimitMiddleware,
+    UploadStaticFiles,
+)
 from seed import seed_admin
 from admin import router as admin_router
 from routers.admin_problems import admin_problems_router
@@ -32,6 +55,11 @@ from routers.admin_stats import router as admin_stats_router
 from routers.saved import router as saved_router
 from routers.comments import router as comments_router
 from routers.saved_problems import router as saved_problems_router
+from routers.map import router as map_router
+from routers.metrics import router as metrics_router
+from routers.images import router as images_router
+from routers.export import router as export_router
+from metrics import MetricsMiddleware, instrument_engine
 
 
 
@@ -45,11 +73,23 @@ app = FastAPI(
     version="0.1.0",
     description="API za prijavu komunalnih problema u Splitu",
 )
+app.add_middleware(ResponseCacheMiddleware)
+app.add_middleware(BodySizeLimitMiddleware)
+app.add_middleware(MetricsMiddleware)
+for e in ALL_ENGINES:
+    instrument_engine(e)
 
 # ---------------------------
 # DATABASE INIT
 # ---------------------------
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
+create_spatial_index(engine)
+create_search_index(engine)
+create_vote_counter(engine)
+create_notification_counter(engine)
+notify.ensure_notification_versions(engine)
+create_blob_refcounts(engine)
 
 
 def seed_statuses():
@@ -63,13 +103,34 @@ def seed_statuses():
 
 seed_admin()
 seed_statuses()
+ensure_clusters(engine)
+
+
+@app.on_event("startup")
+async def start_background_tasks():
+    app.state.trending_task = asyncio.create_task(trending_refresher())
+    app.state.retention_task = asyncio.create_task(retention_job())
+    app.state.digest_task = asyncio.create_task(notify.digest_job())
+    write_queue.start()
+    ingest_queue.start()
+    await ingest_queue.enqueue_pending()
+
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    app.state.trending_task.cancel()
+    app.state.retention_task.cancel()
+    app.state.digest_task.cancel()
+    notify.broker.close()
+    await ingest_queue.stop()
+    await write_queue.stop()
+    thumbnail_cache.shutdown()
 
 # ---------------------------
 # UPLOADS
 # ---------------------------
-UPLOAD_FOLDER = "uploads"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=UPLOAD_FOLDER), name="uploads")
+app.mount("/uploads", UploadStaticFiles(directory=UPLOAD_FOLDER), name="uploads")
 
 # ---------------------------
 # EXCEPTION HANDLERS
@@ -100,29 +161,52 @@ def health_check():
 # AUTH
 # ---------------------------
 @app.post("/register")
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    if db.query(models.User).filter_by(username=user.username).first():
+async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    # hashiranje ide na argon2 pool, DB pozivi u threadpool (ne blokiraju event loop)
+    existing = await run_in_threadpool(
+        lambda: db.query(models.User.id).filter_by(username=user.username).first()
+    )
+    # vrati writer konekciju u pool dok traje argon2
+    await run_in_threadpool(db.rollback)
+    if existing:
         raise HTTPException(status_code=400, detail="Username already exists")
 
     new_user = models.User(
         username=user.username,
-        password=hash_password(user.password),
+        password=await hash_password_async(user.password),
         is_admin=False,
     )
     db.add(new_user)
-    db.commit()
+    await run_in_threadpool(db.commit)
     return {"message": "User created"}
 
 
 @app.post("/login")
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db),
 ):
-    user = db.query(models.User).filter_by(username=form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password):
+    user = await run_in_threadpool(
+        lambda: db.query(models.User.id, models.User.username, models.User.password)
+        .filter_by(username=form_data.username)
+        .first()
+    )
+    # vrati writer konekciju u pool dok traje argon2
+    await run_in_threadpool(db.rollback)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    valid, new_hash = await verify_and_update_password(form_data.password, user.password)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    # hash je rađen sa starim argon2 parametrima – zamijeni ga
+    if new_hash:
+        def save_new_hash():
+            db.query(models.User).filter_by(id=user.id).update({"password": new_hash})
+            db.commit()
+        await run_in_threadpool(save_new_hash)
+
     token = create_access_token({"sub": user.username})
     return {"access_token": token, "token_type": "bearer"}
 
@@ -133,16 +217,14 @@ def login(
 async def create_problem(
     form: schemas.ProblemCreate = Depends(schemas.ProblemCreateForm),
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
 ):
     validate_upload_file(file)
-
-    file_path = f"{UPLOAD_FOLDER}/{file.filename}"
+    upload = await save_upload(file)
 
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await db.execute(register_blob(upload))
 
         location = models.Location(
             latitude=form.latitude,
@@ -150,59 +232,66 @@ async def create_problem(
             address=form.address,
         )
         db.add(location)
-        db.flush()
+        await db.flush()
 
-        status = db.query(models.Status).filter_by(name="open").first()
+        status = await db.scalar(select(models.Status).filter_by(name="open"))
 
         problem = models.Problem(
             title=form.title,
             description=form.description,
-            image_path=file_path,
+            image_path=upload.path,
             location_id=location.id,
             status_id=status.id,
             user_id=current_user.id,
         )
 
         db.add(problem)
-        db.commit()
-        db.refresh(problem)
-        return problem
-
+        await db.run_sync(lambda s: add_to_clusters(s, problem, location))
+        await db.commit()
+        await db.refresh(problem, ["created_at", "status"])
     except Exception as e:
-        db.rollback()
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        # slika je možda dijeljena s drugim problemom; bez reference je
+        # kasnije briše storage.collect_garbage
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Greška pri spremanju problema")
 
+    invalidate("problems", "map")
+
+    # normalizacija ide u pozadini, image_path se ažurira kad završi
+    if upload.created:
+        ingest_queue.submit(upload)
+    return problem
+
 @app.post("/problems/{problem_id}/comments", response_model=schemas.CommentOut)
-def add_comment(
+async def add_comment(
     problem_id: int,
     data: schemas.CommentCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: models.User = Depends(get_current_user_async)
 ):
-    problem = db.query(models.Problem).filter(models.Problem.id == problem_id).first()
-    if not problem:
-        raise HTTPException(status_code=404, detail="Problem not found")
-
-    comment = models.Comment(
-        text=data.text,
-        user_id=current_user.id,
-        problem_id=problem_id
-    )
-
-    db.add(comment)
-    db.commit()
-    db.refresh(comment)
+    # komentar i notifikacija idu u istu transakciju (group commit)
+    async def write(db):
+        problem = await db.get(models.Problem, problem_id)
+        if not problem:
+            raise HTTPException(status_code=404, detail="Problem not found")
+
+        comment = models.Comment(
+            text=data.text,
+            user_id=current_user.id,
+            problem_id=problem_id
+        )
+        db.add(comment)
 
-    note = Notification(
-    user_id=problem.user_id,
-    message=f"Novi komentar na tvoj problem: {problem.title}"
-    )
+        # notifikacija vlasniku problema (ako komentator nije vlasnik)
+        note = None
+        if problem.user_id is not None and problem.user_id != current_user.id:
+            note = await db.run_sync(notify.add_notification, problem.user_id, problem, "comment")
 
-    db.add(note)
-    db.commit()
+        await db.run_sync(lambda s: update_trending(s, problem_id))
+        return comment, note
 
+    comment, note = await write_queue.submit(write)
+    invalidate(f"comments:{problem_id}", "trending")
+    notify.publish(note)
 
     return {
         "id": comment.id,
@@ -215,68 +304,83 @@ app.include_router(notifications_router)
 
 
 @app.get("/problems/{problem_id}/comments", response_model=list[schemas.CommentOut])
-def list_comments(problem_id: int, db: Session = Depends(get_db)):
-    return [
-        {
-            "id": c.id,
-            "text": c.text,
-            "created_at": c.created_at,
-            "username": c.user.username
-        }
-        for c in db.query(models.Comment)
+async def list_comments(problem_id: int, db: AsyncSession = Depends(get_async_db)):
+    rows = await db.execute(
+        select(*COMMENT_COLUMNS)
+        .join(models.User, models.Comment.user_id == models.User.id)
         .filter(models.Comment.problem_id == problem_id)
         .order_by(models.Comment.created_at.asc())
-        .all()
-    ]
+    )
+    return ORJSONResponse(row_dicts(rows))
 
 app.include_router(votes_router)
 
-@app.get("/problems", response_model=dict)
-def list_problems(
+@app.get("/problems", response_model=schemas.ProblemPage)
+async def list_problems(
     status: str | None = None,
     search: str | None = None,
+    sort: str | None = None,
+    cursor: str | None = None,
     page: int = 1,
-    limit: int = 10,
-    db: Session = Depends(get_db)
+    limit: int = Query(10, ge=1, le=100),
+    with_total: bool = False,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(models.Problem)
+    query = select(*PROBLEM_COLUMNS).join(models.Status, models.Problem.status_id == models.Status.id)
 
     # FILTER PO STATUSU
     if status:
-        status_obj = db.query(models.Status).filter(models.Status.name == status).first()
+        status_obj = await db.scalar(select(models.Status).filter(models.Status.name == status))
         if status_obj:
             query = query.filter(models.Problem.status_id == status_obj.id)
 
-    # SEARCH PO NASLOVU I OPISU
+    # SEARCH PO NASLOVU I OPISU (FTS5)
+    matched = False
     if search:
-        query = query.filter(
-            or_(
-                models.Problem.title.ilike(f"%{search}%"),
-                models.Problem.description.ilike(f"%{search}%")
-            )
-        )
-
-    total = query.count()
-
-    problems = (
-        query
-        .order_by(models.Problem.created_at.desc())
-        .offset((page - 1) * limit)
-        .limit(limit)
-        .all()
-    )
-
-    return {
+        query, matched = match_problems(query, models.Problem.id, search)
+
+    total = await cached_count(("problems", status, search), db, query) if with_total else None
+
+    # KEYSET PAGINACIJA PO (bm25, id) uz pretragu, inače po (created_at, id)
+    if sort is None:
+        sort = "relevance" if matched else "new"
+
+    if sort == "relevance" and matched:
+        keys, descending = [bm25_rank().label("cursor_rank"), models.Problem.id.label("cursor_id")], False
+    else:
+        keys, descending = [
+            type_coerce(models.Problem.created_at, String).label("cursor_created_at"),
+            models.Problem.id.label("cursor_id")
+        ], True
+    query = query.add_columns(*keys).order_by(*[k.desc() if descending else k.asc() for k in keys])
+
+    if cursor:
+        try:
+            query = query.filter(keyset_filter(keys, decode_cursor(cursor, 2), descending=descending))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    elif page > 1:
+        query = query.offset((page - 1) * limit)
+
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    next_cursor = encode_cursor(*rows[limit - 1][-len(keys):]) if len(rows) > limit else None
+
+    return ORJSONResponse({
         "page": page,
         "limit": limit,
         "total": total,
-        "items": problems
-    }
+        "next_cursor": next_cursor,
+        "items": problem_dicts(rows[:limit])
+    })
 
 
 @app.get("/problems/{problem_id}", response_model=schemas.ProblemResponse)
-def get_problem(problem_id: int, db: Session = Depends(get_db)):
-    problem = db.query(models.Problem).filter_by(id=problem_id).first()
+async def get_problem(problem_id: int, db: AsyncSession = Depends(get_async_db)):
+    problem = await db.scalar(
+        select(models.Problem)
+        .options(joinedload(models.Problem.status))
+        .filter_by(id=problem_id)
+    )
     if not problem:
         raise HTTPException(status_code=404, detail="Problem not found")
     return problem
@@ -323,3 +427,7 @@ app.include_router(admin_stats_router)
 app.include_router(saved_router)
 app.include_router(comments_router)
 app.include_router(saved_problems_router)
+app.include_router(map_router)
+app.include_router(metrics_router)
+app.include_router(images_router)
+app.include_router(export_router)
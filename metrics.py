@@ -0,0 +1,150 @@
+import threading
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+
+# Metrike po ruti u Prometheus text formatu (izložene na /metrics).
+# p50/p99 se računaju u Prometheusu: histogram_quantile(0.99, ...).
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+QUERY_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+_request_stats: ContextVar[dict | None] = ContextVar("request_stats", default=None)
+_lock = threading.Lock()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name, help, labelnames):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self.values = {}
+
+    def inc(self, labels, amount=1):
+        with _lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames, buckets):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self.buckets = buckets
+        self.values = {}
+
+    def observe(self, labels, value):
+        with _lock:
+            series = self.values.setdefault(labels, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self.values.items()):
+            for bound, count in zip(self.buckets, series["buckets"]):
+                le = _labels(self.labelnames, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {count}")
+            inf = _labels(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {series['count']}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {series['sum']}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series['count']}")
+        return lines
+
+
+REQUESTS = Counter("http_requests_total", "HTTP zahtjevi po ruti i statusu", ("method", "route", "status"))
+LATENCY = Histogram("http_request_duration_seconds", "Trajanje zahtjeva", ("method", "route"), LATENCY_BUCKETS)
+QUERY_COUNT = Histogram("db_queries_per_request", "Broj SQL naredbi po zahtjevu", ("method", "route"), QUERY_COUNT_BUCKETS)
+QUERY_TIME = Histogram("db_query_seconds_per_request", "Ukupno SQL vrijeme po zahtjevu", ("method", "route"), QUERY_TIME_BUCKETS)
+BODY_BYTES = Counter("http_request_body_bytes_total", "Primljeni bajtovi tijela zahtjeva (uploadi)", ("method", "route"))
+WRITE_BATCH_SIZE = Histogram("db_write_batch_size", "Broj operacija po group commitu (write_queue)", (), BATCH_SIZE_BUCKETS)
+
+ALL_METRICS = [REQUESTS, LATENCY, QUERY_COUNT, QUERY_TIME, BODY_BYTES, WRITE_BATCH_SIZE]
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---------------------------
+# SQL HOOKS
+# ---------------------------
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats["queries"] += 1
+        stats["query_time"] += elapsed
+
+
+def instrument_engine(engine):
+    """Registrira hookove koji SQL naredbe pribrajaju zahtjevu koji ih je izvršio."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ---------------------------
+# ASGI MIDDLEWARE
+# ---------------------------
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = {"queries": 0, "query_time": 0.0, "body_bytes": 0, "status": 500}
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request":
+                stats["body_bytes"] += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                stats["status"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            route = scope.get("route")
+            labels = (scope["method"], route.path if route is not None else "unmatched")
+
+            REQUESTS.inc(labels + (str(stats["status"]),))
+            LATENCY.observe(labels, time.perf_counter() - start)
+            QUERY_COUNT.observe(labels, stats["queries"])
+            QUERY_TIME.observe(labels, stats["query_time"])
+            if stats["body_bytes"]:
+                BODY_BYTES.inc(labels, stats["body_bytes"])
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, UniqueConstraint, Boolean
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, UniqueConstraint, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -11,11 +11,16 @@ class User(Base):
     password = Column(String)
     is_admin = Column(Integer, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # održava se triggerima na notifications (vidi counters.py)
+    unread_notifications = Column(Integer, nullable=False, default=0, server_default="0")
+    # umjesto pojedinačnih notifikacija jedan dnevni sažetak (vidi notify.py)
+    notification_digest = Column(Boolean, nullable=False, default=False, server_default="0")
 
     problems = relationship("Problem", back_populates="user")
     votes = relationship("ProblemVote", back_populates="user", cascade="all, delete")
     notifications = relationship("Notification", back_populates="user", cascade="all, delete")
     saved_problems = relationship("SavedProblem", back_populates="user", cascade="all, delete")
+    comments = relationship("Comment", back_populates="user", cascade="all, delete")
 
 
 
@@ -24,8 +29,9 @@ class User(Base):
 class Location(Base):
     __tablename__ = "locations"
     id = Column(Integer, primary_key=True, index=True)
-    latitude = Column(String)
-    longitude = Column(String)
+    # indeksirano u R*Tree tablici location_rtree (vidi spatial.py)
+    latitude = Column(Float)
+    longitude = Column(Float)
     address = Column(String)
 
 
@@ -53,6 +59,9 @@ class Problem(Base):
 
     image_url = Column(String, nullable=True)
 
+    # denormalizirani broj glasova, održavaju ga triggeri (vidi counters.py)
+    vote_count = Column(Integer, nullable=False, default=0, server_default="0")
+
     status_history = relationship(
         "ProblemStatusHistory",
         back_populates="problem",
@@ -62,6 +71,13 @@ class Problem(Base):
     comments = relationship("Comment", back_populates="problem", cascade="all, delete")
     votes = relationship("ProblemVote", back_populates="problem", cascade="all, delete")
     saved_by_users = relationship("SavedProblem", back_populates="problem", cascade="all, delete")
+    trending_entries = relationship("TrendingProblem", back_populates="problem", cascade="all, delete")
+
+    # keyset paginacija po (created_at, id)
+    __table_args__ = (
+        Index("ix_problems_created_at_id", "created_at", "id"),
+        Index("ix_problems_vote_count_id", "vote_count", "id"),
+    )
 
 
 
@@ -92,9 +108,9 @@ class Comment(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user_id = Column(Integer, ForeignKey("users.id"))
-    problem_id = Column(Integer, ForeignKey("problems.id"))
+    problem_id = Column(Integer, ForeignKey("problems.id"), index=True)
 
-    user = relationship("User")
+    user = relationship("User", back_populates="comments")
     problem = relationship("Problem", back_populates="comments")
 
 class ProblemVote(Base):
@@ -119,6 +135,17 @@ class Notification(Base):
     message = Column(String, nullable=False)
     is_read = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # za spajanje istih događaja u jedan redak (vidi notify.add_notification)
+    problem_id = Column(Integer, ForeignKey("problems.id", ondelete="SET NULL"), nullable=True)
+    kind = Column(String, nullable=True)
+    count = Column(Integer, nullable=False, default=1, server_default="1")
+    # raste kod svakog upisa ili spajanja; SSE id i Last-Event-ID (vidi notify.next_version)
+    version = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ix_notifications_user_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_notifications_version", "version"),
+    )
 
     user = relationship("User", back_populates="notifications")
 
@@ -135,3 +162,48 @@ class SavedProblem(Base):
 
     user = relationship("User", back_populates="saved_problems")
     problem = relationship("Problem", back_populates="saved_by_users")
+
+
+class MapCluster(Base):
+    """Predagregirani broj problema po zoomu, tileu i statusu (vidi clusters.py)."""
+    __tablename__ = "map_clusters"
+
+    zoom = Column(Integer, primary_key=True)
+    tile_x = Column(Integer, primary_key=True)
+    tile_y = Column(Integer, primary_key=True)
+    status_id = Column(Integer, ForeignKey("statuses.id"), primary_key=True)
+
+    count = Column(Integer, nullable=False, default=0)
+    lat_sum = Column(Float, nullable=False, default=0)
+    lng_sum = Column(Float, nullable=False, default=0)
+
+
+class TrendingProblem(Base):
+    """Materijalizirani top-K trending problema po vremenskom prozoru (vidi ranking.py)."""
+    __tablename__ = "trending_problems"
+
+    period = Column(String, primary_key=True)
+    problem_id = Column(Integer, ForeignKey("problems.id"), primary_key=True)
+    score = Column(Float, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    problem = relationship("Problem", back_populates="trending_entries")
+
+    __table_args__ = (
+        Index("ix_trending_problems_period_score", "period", "score"),
+    )
+
+
+class ImageBlob(Base):
+    """Slika u content-addressed storeu; refcount održavaju triggeri na problems (vidi storage.py)."""
+    __tablename__ = "image_blobs"
+
+    key = Column(String, primary_key=True)   # "ab/cd/<sha256>.jpg"
+    path = Column(String, nullable=False, unique=True)
+    size = Column(Integer, nullable=False)
+    refcount = Column(Integer, nullable=False, default=0, server_default="0")
+    # True za slike koje je već obradio ingest.py (ili su iz njega nastale)
+    normalized = Column(Boolean, nullable=False, default=False, server_default="0")
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # zadnji upload koji je doveo do ove slike; GC je ne dira BLOB_GC_GRACE nakon toga
+    pinned_at = Column(DateTime, nullable=True)
@@ -0,0 +1,327 @@
+import asyncio
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from database import engine as default_engine
+from models import Notification, User
+
+# ---------------------------
+# REAL-TIME NOTIFIKACIJE
+# ---------------------------
+# Write putevi nakon commita zovu publish() s novim Notification redovima,
+# a GET /notifications/stream (SSE) svakom spojenom klijentu šalje samo
+# njegove. MemoryBroker radi unutar jednog procesa; za više workera
+# treba broker koji ide preko vanjskog pub/sub-a (npr. Redis kanal po
+# korisniku), s istim sučeljem.
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("SUBSCRIBER_QUEUE_SIZE", "100"))
+
+_CLOSED = object()
+
+
+class Subscription:
+    """Red poruka jednog SSE klijenta. Ako klijent zaostaje, najstarije poruke se odbacuju."""
+
+    def __init__(self, broker, user_id: int, maxsize: int = SUBSCRIBER_QUEUE_SIZE):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize)
+
+    def deliver(self, payload):
+        # uvijek u event loopu pretplatnika (vidi MemoryBroker.publish)
+        if self._queue.full():
+            self._queue.get_nowait()
+        self._queue.put_nowait(payload)
+
+    async def get(self):
+        """Sljedeća notifikacija (dict) ili None kad je broker zatvoren."""
+        payload = await self._queue.get()
+        return None if payload is _CLOSED else payload
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.broker.unsubscribe(self)
+
+
+class NotificationBroker(ABC):
+    """
+    Sučelje za pub/sub notifikacija. publish() se zove i iz sync endpointa
+    (threadpool) i iz event loopa, pa mora biti thread-safe i ne smije
+    blokirati.
+    """
+
+    @abstractmethod
+    def publish(self, user_id: int, payload: dict):
+        ...
+
+    @abstractmethod
+    def subscribe(self, user_id: int) -> Subscription:
+        ...
+
+    @abstractmethod
+    def unsubscribe(self, subscription: Subscription):
+        ...
+
+    @abstractmethod
+    def close(self):
+        """Završava sve otvorene streamove (kod gašenja aplikacije)."""
+
+
+class MemoryBroker(NotificationBroker):
+    def __init__(self):
+        self._subscribers = {}   # user_id -> set(Subscription)
+        self._lock = threading.Lock()
+
+    def publish(self, user_id, payload):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for sub in subscribers:
+            sub.loop.call_soon_threadsafe(sub.deliver, payload)
+
+    def subscribe(self, user_id):
+        sub = Subscription(self, user_id)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subs = self._subscribers.get(subscription.user_id)
+            if subs is not None:
+                subs.discard(subscription)
+                if not subs:
+                    del self._subscribers[subscription.user_id]
+
+    def close(self):
+        with self._lock:
+            subscribers = [sub for subs in self._subscribers.values() for sub in subs]
+        for sub in subscribers:
+            sub.loop.call_soon_threadsafe(sub.deliver, _CLOSED)
+
+
+broker = MemoryBroker()
+
+
+def set_broker(new_broker: NotificationBroker):
+    global broker
+    broker = new_broker
+
+
+def notification_payload(note):
+    # isti oblik kao schemas.NotificationOut
+    return {
+        "id": note.id,
+        "message": note.message,
+        "is_read": bool(note.is_read),
+        "created_at": note.created_at,
+        "count": note.count,
+        "version": note.version,
+    }
+
+
+def publish(*notes):
+    """
+    Zove se nakon commita za svaki novi ili spojeni Notification (None se
+    preskače). Spojeni redak dolazi ponovno s istim id-em i novim version.
+    """
+    for note in notes:
+        if note is not None:
+            broker.publish(note.user_id, notification_payload(note))
+
+
+# ---------------------------
+# SPAJANJE I DNEVNI SAŽETAK
+# ---------------------------
+# Komentari i glasovi na isti problem ne dodaju novi redak za svaki
+# događaj: dok je vlasnikova notifikacija nepročitana i zadnji događaj
+# nije stariji od COALESCE_WINDOW_SECONDS, postojeći redak dobiva count + 1,
+# novu poruku i novo vrijeme (pa se diže na vrh liste). Korisnici s
+# notification_digest skupljaju događaje po problemu za cijeli dan, bez
+# pusha, a digest_job ih jednom dnevno zamijeni jednim sažetkom.
+# Promjene statusa se ne spajaju i uvijek idu odmah.
+COALESCE_WINDOW_SECONDS = int(os.getenv("NOTIFICATION_COALESCE_WINDOW", "3600"))
+DIGEST_HOUR_UTC = int(os.getenv("NOTIFICATION_DIGEST_HOUR", "7"))
+
+# kind -> (poruka za jedan događaj, poruka za više, oblici imenice)
+MESSAGES = {
+    "comment": (
+        "Novi komentar na tvoj problem: {title}",
+        "{count} {noun} na tvoj problem: {title}",
+        ("novi komentar", "nova komentara", "novih komentara"),
+    ),
+    "vote": (
+        "Netko je glasao za tvoj problem: {title}",
+        "{count} {noun} za tvoj problem: {title}",
+        ("novi glas", "nova glasa", "novih glasova"),
+    ),
+}
+
+
+def next_version():
+    """
+    Sljedeća verzija notifikacije kao podupit unutar samog INSERT/UPDATE-a,
+    pa se računa pod writer lockom i raste i kad se redak spaja.
+    """
+    return select(func.coalesce(func.max(Notification.version), 0) + 1).scalar_subquery()
+
+
+def ensure_notification_versions(engine=default_engine):
+    """Kod startupa: redovi od prije stupca version dobivaju verziju iznad svih postojećih."""
+    with engine.begin() as conn:
+        conn.execute(text(
+            "UPDATE notifications SET version = id + COALESCE((SELECT MAX(version) FROM notifications), 0) "
+            "WHERE version IS NULL"
+        ))
+
+
+def _plural(n, one, few, many):
+    if n % 10 == 1 and n % 100 != 11:
+        return one
+    if 2 <= n % 10 <= 4 and not 12 <= n % 100 <= 14:
+        return few
+    return many
+
+
+def _message(kind, count, title):
+    single, multiple, nouns = MESSAGES[kind]
+    if count == 1:
+        return single.format(title=title)
+    return multiple.format(count=count, noun=_plural(count, *nouns), title=title)
+
+
+def add_notification(db: Session, user_id: int, problem, kind: str, message: str | None = None):
+    """
+    Dodaje ili spaja notifikaciju u transakciji `db` (sync Session; iz
+    async koda preko db.run_sync). Vraća redak za publish() nakon commita,
+    ili None ako korisnik dobiva dnevni sažetak.
+    """
+    now = datetime.utcnow()
+    if kind not in MESSAGES:
+        note = Notification(
+            user_id=user_id, problem_id=problem.id, kind=kind, message=message,
+            created_at=now, version=next_version(),
+        )
+        db.add(note)
+        db.flush()
+        return note
+
+    digest = db.scalar(select(User.notification_digest).where(User.id == user_id))
+    if digest:
+        since = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    else:
+        since = now - timedelta(seconds=COALESCE_WINDOW_SECONDS)
+
+    note = db.scalar(
+        select(Notification)
+        .where(
+            Notification.user_id == user_id,
+            Notification.problem_id == problem.id,
+            Notification.kind == kind,
+            Notification.is_read.isnot(True),
+            Notification.created_at >= since,
+        )
+        .order_by(Notification.id.desc())
+        .limit(1)
+    )
+    if note is None:
+        note = Notification(
+            user_id=user_id, problem_id=problem.id, kind=kind, count=1,
+            message=_message(kind, 1, problem.title), created_at=now,
+        )
+        db.add(note)
+    else:
+        note.count += 1
+        note.message = _message(kind, note.count, problem.title)
+        note.created_at = now
+    note.version = next_version()
+    # flush odmah: da ga vidi i sljedeći događaj u istom batchu write queuea,
+    # a version se učita dok je sesija još otvorena
+    db.flush()
+    note.version
+    return None if digest else note
+
+
+def _digest_message(rows):
+    totals = {}
+    for kind, _, count in rows:
+        totals[kind] = totals.get(kind, 0) + count
+    parts = [f"{n} {_plural(n, *MESSAGES[kind][2])}" for kind, n in totals.items()]
+    problems = len({problem_id for _, problem_id, _ in rows})
+    return (
+        f"Dnevni sažetak: {' i '.join(parts)} "
+        f"na {problems} {_plural(problems, 'problemu', 'problema', 'problema')}"
+    )
+
+
+def send_digests(engine=default_engine, before: datetime | None = None):
+    """
+    Za svakog korisnika s notification_digest zamjenjuje nepročitane spojene
+    notifikacije starije od `before` (zadano: današnja ponoć UTC) jednim
+    sažetkom. Vraća broj poslanih sažetaka.
+    """
+    now = datetime.utcnow()
+    before = before or now.replace(hour=0, minute=0, second=0, microsecond=0)
+    pending = (
+        Notification.kind.in_(MESSAGES),
+        Notification.is_read.isnot(True),
+        Notification.created_at < before,
+    )
+    with Session(engine) as db:
+        user_ids = db.scalars(
+            select(Notification.user_id).distinct()
+            .join(User, User.id == Notification.user_id)
+            .where(User.notification_digest.is_(True), *pending)
+        ).all()
+
+    sent = 0
+    for user_id in user_ids:
+        # DELETE ... RETURNING: spojeni redak koji se u međuvremenu pomaknuo
+        # na danas ne ulazi u sažetak i ne briše se
+        with engine.begin() as conn:
+            rows = conn.execute(
+                delete(Notification)
+                .where(Notification.user_id == user_id, *pending)
+                .returning(Notification.kind, Notification.problem_id, Notification.count,
+                           Notification.version)
+            ).all()
+            if not rows:
+                continue
+            payload = {
+                "message": _digest_message([row[:3] for row in rows]),
+                "is_read": False,
+                "created_at": now,
+                "count": sum(count for _, _, count, _ in rows),
+            }
+            # obrisani redovi su mogli imati najveću verziju; sažetak mora
+            # dobiti veću, inače ga klijent s tim Last-Event-ID preskoči
+            deleted_max = max(version or 0 for *_, version in rows)
+            payload["id"], payload["version"] = conn.execute(
+                insert(Notification)
+                .values(user_id=user_id, kind="digest",
+                        version=func.max(next_version(), deleted_max + 1), **payload)
+                .returning(Notification.id, Notification.version)
+            ).one()
+        broker.publish(user_id, payload)
+        sent += 1
+    return sent
+
+
+async def digest_job():
+    """Pozadinski task: svaki dan u DIGEST_HOUR_UTC šalje dnevne sažetke."""
+    while True:
+        now = datetime.utcnow()
+        next_run = now.replace(hour=DIGEST_HOUR_UTC, minute=0, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        await asyncio.sleep((next_run - now).total_seconds())
+        try:
+            await run_in_threadpool(send_digests)
+        except Exception:
+            logging.getLogger(__name__).exception("Notification digest failed")
@@ -0,0 +1,53 @@
+import base64
+import json
+import os
+from sqlalchemy import and_, or_, func, select
+from ttl_cache import TTLCache
+
+# kratkotrajni cache za "total" da svaki zahtjev ne radi COUNT(*); ključ
+# ovisi o filterima (i tekstu pretrage), pa je broj unosa ograničen
+COUNT_CACHE_TTL = 30
+COUNT_CACHE_SIZE = int(os.getenv("COUNT_CACHE_SIZE", "1000"))
+_count_cache = TTLCache(COUNT_CACHE_SIZE)
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Vraća listu od `size` vrijednosti ili baca ValueError za neispravan cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def keyset_filter(columns, values, descending: bool):
+    """
+    WHERE uvjet za "sljedeću stranicu" nakon retka s vrijednostima `values`
+    po stupcima `columns` (npr. (created_at, id)), bez OFFSET-a.
+    """
+    clauses = []
+    for i, col in enumerate(columns):
+        equal = [c == v for c, v in zip(columns[:i], values[:i])]
+        step = col < values[i] if descending else col > values[i]
+        clauses.append(and_(*equal, step))
+    return or_(*clauses)
+
+
+async def cached_count(key, db, stmt) -> int:
+    """COUNT za dani select, keširan COUNT_CACHE_TTL sekundi po ključu filtera."""
+    total = _count_cache.get(key)
+    if total is not None:
+        return total
+
+    total = await db.scalar(select(func.count()).select_from(stmt.order_by(None).subquery()))
+    _count_cache.set(key, total, COUNT_CACHE_TTL)
+    return total
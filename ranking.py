@@ -0,0 +1,132 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from database import SessionLocal
+from models import Problem, Comment, TrendingProblem
+from response_cache import invalidate
+
+# Gravity score (kao Hacker News): (glasovi + w * komentari) / (sati + 2) ^ G.
+# Stari problemi padaju prema dnu iako imaju puno glasova.
+GRAVITY = 1.8
+COMMENT_WEIGHT = 2.0
+
+WINDOWS = {
+    "24h": timedelta(hours=24),
+    "7d": timedelta(days=7),
+    "30d": timedelta(days=30),
+}
+TOP_K = 100
+REFRESH_SECONDS = 300
+
+
+def trending_score(votes: int, comments: int, created_at: datetime, now: datetime) -> float:
+    age_hours = max((now - created_at).total_seconds(), 0) / 3600
+    return (votes + COMMENT_WEIGHT * comments) / (age_hours + 2) ** GRAVITY
+
+
+def _trim(db: Session, period: str):
+    keep = (
+        db.query(TrendingProblem.problem_id)
+        .filter(TrendingProblem.period == period)
+        .order_by(TrendingProblem.score.desc())
+        .limit(TOP_K)
+    )
+    (
+        db.query(TrendingProblem)
+        .filter(TrendingProblem.period == period, TrendingProblem.problem_id.notin_(keep))
+        .delete(synchronize_session=False)
+    )
+
+
+def update_trending(db: Session, problem_id: int):
+    """
+    Inkrementalno osvježava score jednog problema nakon glasa ili komentara.
+    Poziva se prije commita, u istoj transakciji kao i sam glas/komentar.
+    """
+    db.flush()
+    row = (
+        db.query(
+            Problem.created_at,
+            Problem.vote_count,
+            db.query(func.count(Comment.id))
+            .filter(Comment.problem_id == Problem.id)
+            .scalar_subquery()
+        )
+        .filter(Problem.id == problem_id)
+        .first()
+    )
+    if row is None or row[0] is None:
+        return
+
+    created_at, votes, comments = row
+    now = datetime.utcnow()
+    score = trending_score(votes or 0, comments, created_at, now)
+
+    for period, span in WINDOWS.items():
+        if now - created_at > span:
+            continue
+        stmt = insert(TrendingProblem).values(
+            period=period, problem_id=problem_id, score=score, updated_at=now
+        )
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["period", "problem_id"],
+            set_={"score": stmt.excluded.score, "updated_at": stmt.excluded.updated_at},
+        ))
+        _trim(db, period)
+
+
+def refresh_trending(db: Session):
+    """Potpuno preračunavanje top-K za sve prozore (scoreovi s vremenom padaju)."""
+    now = datetime.utcnow()
+    oldest = now - max(WINDOWS.values())
+
+    comment_counts = (
+        db.query(Comment.problem_id, func.count(Comment.id).label("comments"))
+        .group_by(Comment.problem_id)
+        .subquery()
+    )
+    rows = (
+        db.query(Problem.id, Problem.created_at, Problem.vote_count, comment_counts.c.comments)
+        .outerjoin(comment_counts, comment_counts.c.problem_id == Problem.id)
+        .filter(Problem.created_at >= oldest)
+        .all()
+    )
+
+    db.query(TrendingProblem).delete(synchronize_session=False)
+    for period, span in WINDOWS.items():
+        scored = sorted(
+            (
+                (trending_score(votes or 0, comments or 0, created_at, now), problem_id)
+                for problem_id, created_at, votes, comments in rows
+                if now - created_at <= span
+            ),
+            reverse=True,
+        )[:TOP_K]
+        db.add_all(
+            TrendingProblem(period=period, problem_id=problem_id, score=score, updated_at=now)
+            for score, problem_id in scored
+        )
+    db.commit()
+
+
+def _refresh_once():
+    db = SessionLocal()
+    try:
+        refresh_trending(db)
+    finally:
+        db.close()
+
+
+async def trending_refresher():
+    """Pozadinski task: odmah pa svakih REFRESH_SECONDS preračunava trending."""
+    while True:
+        try:
+            await run_in_threadpool(_refresh_once)
+            invalidate("trending")
+        except Exception:
+            logging.getLogger(__name__).exception("Trending refresh failed")
+        await asyncio.sleep(REFRESH_SECONDS)
@@ -0,0 +1,252 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from urllib.parse import parse_qsl, urlencode
+
+# ---------------------------
+# RESPONSE CACHE
+# ---------------------------
+# Javni GET endpointi (lista i detalj problema, karta, trending, komentari)
+# se keširaju po putanji i query parametrima. Svaki unos ima tagove, a
+# write putevi nakon commita zovu invalidate() s tagovima koje su
+# promijenili (npr. glas -> "trending", novi komentar -> "comments:5").
+# TTL je samo osigurač za upise koji ne prolaze kroz app (skripte, main.py).
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "300"))
+
+# browser i proxy smiju spremiti odgovor, ali ga uvijek revalidiraju ETagom
+CACHE_CONTROL = "public, no-cache"
+
+# (regex putanje, funkcija koja iz matcha vraća tagove)
+CACHED_ROUTES = [
+    (re.compile(r"^/problems/?$"), lambda m: ("problems",)),
+    (re.compile(r"^/problems/(\d+)$"), lambda m: (f"problem:{m[1]}",)),
+    (re.compile(r"^/problems/(\d+)/comments$"), lambda m: (f"comments:{m[1]}",)),
+    (re.compile(r"^/comments/(\d+)$"), lambda m: (f"comments:{m[1]}",)),
+    (re.compile(r"^/map/(problems|clusters)$"), lambda m: ("map",)),
+    (re.compile(r"^/trending/?$"), lambda m: ("trending",)),
+]
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    headers: list
+    etag: str
+    tags: tuple
+    expires: float
+    route: object = None   # scope["route"], da metrike i na hit vide pravu rutu
+
+    @property
+    def size(self):
+        return len(self.body) + sum(len(k) + len(v) for k, v in self.headers)
+
+
+class CacheBackend(ABC):
+    """
+    Sučelje za spremište odgovora. versions()/set() služe da odgovor
+    izračunat prije invalidacije ne završi u cacheu nakon nje.
+    """
+
+    @abstractmethod
+    def get(self, key: str):
+        ...
+
+    @abstractmethod
+    def versions(self, tags) -> tuple:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, entry: CachedResponse, versions: tuple):
+        ...
+
+    @abstractmethod
+    def invalidate(self, tags):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+
+class MemoryBackend(CacheBackend):
+    """LRU u memoriji procesa, ograničen ukupnom veličinom odgovora."""
+
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # key -> CachedResponse
+        self._by_tag = {}               # tag -> set(key)
+        self._versions = {}             # tag -> broj invalidacija
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def versions(self, tags):
+        with self._lock:
+            return tuple(self._versions.get(tag, 0) for tag in tags)
+
+    def set(self, key, entry, versions):
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            if versions != tuple(self._versions.get(tag, 0) for tag in entry.tags):
+                return  # u međuvremenu je bio upis
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._total += entry.size
+            for tag in entry.tags:
+                self._by_tag.setdefault(tag, set()).add(key)
+            while self._total > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+                for key in self._by_tag.pop(tag, ()):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_tag.clear()
+            self._total = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._total -= entry.size
+        for tag in entry.tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+
+backend = MemoryBackend()
+
+
+def set_backend(new_backend: CacheBackend):
+    global backend
+    backend = new_backend
+
+
+def invalidate(*tags):
+    """Zove se nakon commita iz svakog write puta koji mijenja keširane odgovore."""
+    backend.invalidate(tags)
+
+
+def problem_tags(problem_id: int):
+    """Sve što ovisi o jednom problemu (za brisanje problema)."""
+    return ("problems", f"problem:{problem_id}", f"comments:{problem_id}", "map", "trending")
+
+
+def cache_key(scope) -> str:
+    query = parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)
+    return f"{scope['path']}?{urlencode(sorted(query))}"
+
+
+def _etag_matches(if_none_match, etag):
+    return if_none_match is not None and (
+        if_none_match.strip() == "*" or etag in (t.strip() for t in if_none_match.split(","))
+    )
+
+
+# ---------------------------
+# ASGI MIDDLEWARE
+# ---------------------------
+class ResponseCacheMiddleware:
+    def __init__(self, app, routes=CACHED_ROUTES, ttl: int = RESPONSE_CACHE_TTL):
+        self.app = app
+        self.routes = routes
+        self.ttl = ttl
+
+    def _tags(self, path):
+        for pattern, tags in self.routes:
+            match = pattern.match(path)
+            if match:
+                return tags(match)
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        tags = self._tags(scope["path"])
+        if tags is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = cache_key(scope)
+        if_none_match = None
+        for name, value in scope["headers"]:
+            if name == b"if-none-match":
+                if_none_match = value.decode("latin-1")
+
+        entry = backend.get(key)
+        if entry is not None:
+            if entry.route is not None:
+                scope["route"] = entry.route
+            await self._send(send, entry.headers, entry.body, _etag_matches(if_none_match, entry.etag))
+            return
+
+        versions = backend.versions(tags)
+        start = None
+        chunks = []
+
+        async def capture(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(chunks)
+            headers = list(start.get("headers", []))
+            cacheable = start["status"] == 200 and not any(
+                name in (b"set-cookie", b"etag") for name, _ in headers
+            )
+            if not cacheable:
+                await send(start)
+                await send({"type": "http.response.body", "body": body})
+                return
+
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            headers += [(b"etag", etag.encode()), (b"cache-control", CACHE_CONTROL.encode())]
+            backend.set(key, CachedResponse(
+                body=body, headers=headers, etag=etag, tags=tags,
+                expires=time.monotonic() + self.ttl, route=scope.get("route"),
+            ), versions)
+            await self._send(send, headers, body, _etag_matches(if_none_match, etag))
+
+        await self.app(scope, receive, capture)
+
+    @staticmethod
+    async def _send(send, headers, body, not_modified):
+        if not_modified:
+            headers = [(k, v) for k, v in headers if k not in (b"content-length", b"content-type")]
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
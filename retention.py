@@ -0,0 +1,64 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, or_, select
+from starlette.concurrency import run_in_threadpool
+from database import engine as default_engine
+from models import Notification
+
+# ---------------------------
+# RETENCIJA NOTIFIKACIJA
+# ---------------------------
+# Pročitane notifikacije starije od NOTIFICATION_RETENTION_DAYS se brišu u
+# batchevima od NOTIFICATION_PRUNE_BATCH redaka, svaki u svojoj kratkoj
+# transakciji, da brisanje ne drži writer lock dok ga čekaju glasovi i
+# komentari. Nepročitane se nikad ne brišu.
+NOTIFICATION_RETENTION_DAYS = int(os.getenv("NOTIFICATION_RETENTION_DAYS", "90"))
+NOTIFICATION_PRUNE_BATCH = int(os.getenv("NOTIFICATION_PRUNE_BATCH", "1000"))
+RETENTION_INTERVAL_SECONDS = int(os.getenv("RETENTION_INTERVAL_SECONDS", str(6 * 3600)))
+
+
+def _prune_batch(cutoff: datetime, batch: int):
+    newest = select(func.max(Notification.version)).correlate(None).scalar_subquery()
+    ids = (
+        select(Notification.id)
+        .where(
+            Notification.is_read.is_(True),
+            Notification.created_at < cutoff,
+            # najveća verzija ostaje, da next_version ne krene ispočetka
+            or_(Notification.version.is_(None), Notification.version < newest),
+        )
+        .limit(batch)
+    )
+    return delete(Notification).where(Notification.id.in_(ids))
+
+
+def prune_notifications(engine=default_engine, days: int = NOTIFICATION_RETENTION_DAYS,
+                        batch: int = NOTIFICATION_PRUNE_BATCH):
+    """Briše stare pročitane notifikacije. Vraća broj obrisanih redaka."""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    removed = 0
+    while True:
+        with engine.begin() as conn:
+            deleted = conn.execute(_prune_batch(cutoff, batch)).rowcount
+        removed += deleted
+        if deleted < batch:
+            return removed
+
+
+async def retention_job():
+    """Pozadinski task: odmah pa svakih RETENTION_INTERVAL_SECONDS."""
+    while True:
+        try:
+            removed = await run_in_threadpool(prune_notifications)
+            if removed:
+                logging.getLogger(__name__).info("Obrisano %d starih notifikacija", removed)
+        except Exception:
+            logging.getLogger(__name__).exception("Notification retention failed")
+        await asyncio.sleep(RETENTION_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    removed = prune_notifications()
+    print(f"✅ obrisano {removed} starih pročitanih notifikacija")
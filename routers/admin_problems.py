@@ -1,9 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import io
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload
 from database import get_db
-from models import Problem, Status, User, Notification, ProblemStatusHistory
+from models import Problem, Status, User, ProblemStatusHistory
 from auth import get_current_user
-from schemas import ProblemResponse, StatusHistoryOut
+from schemas import ProblemResponse, StatusHistoryOut, ImportReport
+from bulk_import import import_problems, detect_format
+from clusters import add_to_clusters, remove_from_clusters
+from response_cache import invalidate, problem_tags
+import notify
+from serialization import PROBLEM_COLUMNS, problem_dicts
 from datetime import datetime
 
 admin_problems_router = APIRouter(
@@ -25,7 +34,12 @@ def admin_required(current_user: User = Depends(get_current_user)):
 # -----------------------------------------------------
 @admin_problems_router.get("/", response_model=list[ProblemResponse])
 def list_all_problems(db: Session = Depends(get_db), current_user: User = Depends(admin_required)):
-    return db.query(Problem).order_by(Problem.created_at.desc()).all()
+    rows = db.execute(
+        select(*PROBLEM_COLUMNS)
+        .join(Status, Problem.status_id == Status.id)
+        .order_by(Problem.created_at.desc())
+    )
+    return ORJSONResponse(problem_dicts(rows))
 
 
 # -----------------------------------------------------
@@ -66,14 +80,19 @@ def update_problem_status(
     db.add(history)
 
     # ✅ PROMIJENI STATUS
+    remove_from_clusters(db, problem)
     problem.status_id = new_status.id
-    note = Notification(
-        user_id=problem.user_id,
-        message=f"Status tvog problema '{problem.title}' je promijenjen u {new_status.name}"
-    )
-    db.add(note)
+    add_to_clusters(db, problem)
+    note = None
+    if problem.user_id is not None:
+        note = notify.add_notification(
+            db, problem.user_id, problem, "status",
+            message=f"Status tvog problema '{problem.title}' je promijenjen u {new_status.name}"
+        )
     db.commit()
     db.refresh(problem)
+    invalidate(f"problem:{problem.id}", "problems", "map", "trending")
+    notify.publish(note)
 
     return {
         "message": "Status updated",
@@ -86,6 +105,11 @@ def update_problem_status(
 def get_problem_status_history(problem_id: int, db: Session = Depends(get_db)):
     history = (
         db.query(ProblemStatusHistory)
+        .options(
+            joinedload(ProblemStatusHistory.old_status),
+            joinedload(ProblemStatusHistory.new_status),
+            joinedload(ProblemStatusHistory.admin)
+        )
         .filter(ProblemStatusHistory.problem_id == problem_id)
         .order_by(ProblemStatusHistory.changed_at.desc())
         .all()
@@ -112,8 +136,36 @@ def delete_problem(problem_id: int, db: Session = Depends(get_db), current_user:
     if not problem:
         raise HTTPException(status_code=404, detail="Problem not found")
 
+    remove_from_clusters(db, problem)
     db.delete(problem)
     db.commit()
+    invalidate(*problem_tags(problem_id))
 
     return {"message": "Problem deleted"}
 
+
+
+# -----------------------------------------------------
+# 4) BULK IMPORT (CSV / NDJSON / GeoJSON)
+# -----------------------------------------------------
+@admin_problems_router.post("/import", response_model=ImportReport)
+def import_problems_file(
+    file: UploadFile = File(...),
+    format: Optional[Literal["csv", "ndjson", "geojson"]] = Query(None),
+    current_user: User = Depends(admin_required)
+):
+    fmt = format or detect_format(file.filename)
+    if fmt is None:
+        raise HTTPException(status_code=400, detail="Nepoznat format, zadaj ?format=csv|ndjson|geojson")
+
+    # sync endpoint: import se vrti u threadpoolu i ne blokira event loop
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        report = import_problems(stream, fmt, user_id=current_user.id)
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Neispravna datoteka: {e}")
+    finally:
+        stream.detach()
+        # i kod greške: batchevi prije neispravnog dijela su već upisani
+        invalidate("problems", "map")
+    return report
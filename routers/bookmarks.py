@@ -1,59 +1,60 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload
 from database import get_db
 from models import Problem, SavedProblem, User
-from auth import get_current_user
+from auth import get_current_user, get_current_user_async
+from write_queue import write_queue
 
 router = APIRouter(prefix="/bookmarks", tags=["Bookmarks"])
 
 @router.post("/{problem_id}")
-def save_problem(
+async def save_problem(
     problem_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_async)
 ):
-    problem = db.query(Problem).filter(Problem.id == problem_id).first()
-    if not problem:
-        raise HTTPException(status_code=404, detail="Problem not found")
+    async def write(db):
+        problem = await db.get(Problem, problem_id)
+        if not problem:
+            raise HTTPException(status_code=404, detail="Problem not found")
 
-    exists = (
-        db.query(SavedProblem)
-        .filter(
-            SavedProblem.user_id == current_user.id,
-            SavedProblem.problem_id == problem_id
+        exists = await db.scalar(
+            select(SavedProblem.id)
+            .where(
+                SavedProblem.user_id == current_user.id,
+                SavedProblem.problem_id == problem_id
+            )
         )
-        .first()
-    )
 
-    if exists:
-        raise HTTPException(status_code=400, detail="Already saved")
+        if exists:
+            raise HTTPException(status_code=400, detail="Already saved")
+
+        db.add(SavedProblem(user_id=current_user.id, problem_id=problem_id))
 
-    saved = SavedProblem(user_id=current_user.id, problem_id=problem_id)
-    db.add(saved)
-    db.commit()
+    await write_queue.submit(write)
 
     return {"message": "Problem saved"}
 
 @router.delete("/{problem_id}")
-def unsave_problem(
+async def unsave_problem(
     problem_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_async)
 ):
-    saved = (
-        db.query(SavedProblem)
-        .filter(
-            SavedProblem.user_id == current_user.id,
-            SavedProblem.problem_id == problem_id
+    async def write(db):
+        saved = await db.scalar(
+            select(SavedProblem)
+            .where(
+                SavedProblem.user_id == current_user.id,
+                SavedProblem.problem_id == problem_id
+            )
         )
-        .first()
-    )
 
-    if not saved:
-        raise HTTPException(status_code=404, detail="Not saved")
+        if not saved:
+            raise HTTPException(status_code=404, detail="Not saved")
+
+        await db.delete(saved)
 
-    db.delete(saved)
-    db.commit()
+    await write_queue.submit(write)
 
     return {"message": "Problem removed from bookmarks"}
 
@@ -64,6 +65,7 @@ def list_saved(
 ):
     saved = (
         db.query(SavedProblem)
+        .options(joinedload(SavedProblem.problem).joinedload(Problem.status))
         .filter(SavedProblem.user_id == current_user.id)
         .all()
     )
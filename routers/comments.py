@@ -1,9 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import get_db
-from models import Comment, Problem, Notification, User
-from auth import get_current_user
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+from models import Comment, Problem, User
+from auth import get_current_user_async
 from schemas import CommentOut
+from ranking import update_trending
+from write_queue import write_queue
+from serialization import COMMENT_COLUMNS, row_dicts
+from response_cache import invalidate
+import notify
 
 router = APIRouter(prefix="/comments", tags=["Comments"])
 
@@ -11,45 +18,51 @@ router = APIRouter(prefix="/comments", tags=["Comments"])
 # 1️⃣ Dodavanje komentara
 # --------------------------------------------
 @router.post("/", response_model=CommentOut)
-def add_comment(
+async def add_comment(
     problem_id: int,
     text: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_async)
 ):
-    problem = db.query(Problem).filter(Problem.id == problem_id).first()
-    if not problem:
-        raise HTTPException(status_code=404, detail="Problem not found")
+    async def write(db: AsyncSession):
+        problem = await db.get(Problem, problem_id)
+        if not problem:
+            raise HTTPException(status_code=404, detail="Problem not found")
 
-    # Kreiranje komentara
-    comment = Comment(
-        text=text,
-        user_id=current_user.id,
-        problem_id=problem.id
-    )
-    db.add(comment)
-
-    # ⚡ Kreiranje notifikacije vlasniku problema (ako komentator nije vlasnik)
-    if problem.user_id != current_user.id:
-        note = Notification(
-            user_id=problem.user_id,
-            message=f"Novi komentar na tvoj problem: {problem.title}"
+        # Kreiranje komentara
+        comment = Comment(
+            text=text,
+            user_id=current_user.id,
+            problem_id=problem.id
         )
-        db.add(note)
+        db.add(comment)
+
+        # ⚡ Kreiranje notifikacije vlasniku problema (ako komentator nije vlasnik)
+        note = None
+        if problem.user_id is not None and problem.user_id != current_user.id:
+            note = await db.run_sync(notify.add_notification, problem.user_id, problem, "comment")
+
+        await db.run_sync(lambda s: update_trending(s, problem.id))
+        return comment, note
 
-    db.commit()
-    db.refresh(comment)
-    return comment
+    comment, note = await write_queue.submit(write)
+    invalidate(f"comments:{problem_id}", "trending")
+    notify.publish(note)
+    return {
+        "id": comment.id,
+        "text": comment.text,
+        "created_at": comment.created_at,
+        "username": current_user.username
+    }
 
 # --------------------------------------------
 # 2️⃣ Dohvat svih komentara za problem
 # --------------------------------------------
 @router.get("/{problem_id}", response_model=list[CommentOut])
-def get_comments(problem_id: int, db: Session = Depends(get_db)):
-    comments = (
-        db.query(Comment)
-        .filter(Comment.problem_id == problem_id)
+async def get_comments(problem_id: int, db: AsyncSession = Depends(get_async_db)):
+    rows = await db.execute(
+        select(*COMMENT_COLUMNS)
+        .join(User, Comment.user_id == User.id)
+        .where(Comment.problem_id == problem_id)
         .order_by(Comment.created_at.asc())
-        .all()
     )
-    return comments
+    return ORJSONResponse(row_dicts(rows))
@@ -0,0 +1,173 @@
+import csv
+import io
+import os
+import zlib
+from datetime import datetime, timezone
+from typing import Literal
+
+import orjson
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from database import ReadSessionLocal
+from models import Location, Problem, Status
+from auth import get_current_user
+from fulltext import match_problems
+
+router = APIRouter(
+    prefix="/export",
+    tags=["Export"],
+    dependencies=[Depends(get_current_user)]
+)
+
+# ---------------------------
+# STREAMING EXPORT
+# ---------------------------
+# Upit se čita kursorom u komadima od EXPORT_BATCH_SIZE redaka (yield_per),
+# svaki komad se odmah kodira i šalje, pa memorija ne ovisi o broju redaka.
+# Generator je sync: StreamingResponse ga vrti u threadpoolu, a sesija se
+# zatvara kad generator završi ili ga klijent prekine.
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORT_FIELDS = (
+    "id", "title", "description", "status", "created_at",
+    "latitude", "longitude", "address", "image_url", "vote_count",
+)
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "geojson": "application/geo+json",
+}
+
+
+def _coord(value):
+    # stare lokacije imaju koordinate spremljene kao tekst
+    return float(value) if value not in (None, "") else None
+
+
+def _utc(value: datetime | None):
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _record(row):
+    return {
+        "id": row.id,
+        "title": row.title,
+        "description": row.description,
+        "status": row.status,
+        "created_at": row.created_at,
+        "latitude": _coord(row.latitude),
+        "longitude": _coord(row.longitude),
+        "address": row.address,
+        "image_url": row.image_url,
+        "vote_count": row.vote_count,
+    }
+
+
+def encode_ndjson(rows):
+    return b"".join(orjson.dumps(_record(r)) + b"\n" for r in rows)
+
+
+def encode_csv(rows):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    for r in rows:
+        record = _record(r)
+        if record["created_at"] is not None:
+            record["created_at"] = record["created_at"].isoformat()
+        writer.writerow(record.values())
+    return out.getvalue().encode("utf-8")
+
+
+def _feature(row):
+    record = _record(row)
+    lat, lng = record.pop("latitude"), record.pop("longitude")
+    geometry = {"type": "Point", "coordinates": [lng, lat]} if lat is not None and lng is not None else None
+    return orjson.dumps({"type": "Feature", "id": record["id"], "geometry": geometry, "properties": record})
+
+
+# (zaglavlje, kodiranje komada, separator između komada, završetak)
+ENCODERS = {
+    "ndjson": (b"", encode_ndjson, b"", b""),
+    "csv": (",".join(EXPORT_FIELDS).encode() + b"\r\n", encode_csv, b"", b""),
+    "geojson": (
+        b'{"type":"FeatureCollection","features":[',
+        lambda rows: b",".join(_feature(r) for r in rows),
+        b",",
+        b"]}",
+    ),
+}
+
+
+def _stream(query, fmt):
+    header, encode, separator, footer = ENCODERS[fmt]
+    yield header
+    with ReadSessionLocal() as db:
+        result = db.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for i, rows in enumerate(result.partitions()):
+            yield (separator if i else b"") + encode(rows)
+    yield footer
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip format
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@router.get("/problems")
+def export_problems(
+    format: Literal["ndjson", "csv", "geojson"] = "ndjson",
+    status: str | None = None,
+    search: str | None = None,
+    since: datetime | None = Query(None, description="created_at >= since (ISO 8601)"),
+    until: datetime | None = Query(None, description="created_at < until (ISO 8601)"),
+    gzip: bool = False,
+):
+    query = (
+        select(
+            Problem.id,
+            Problem.title,
+            Problem.description,
+            Status.name.label("status"),
+            Problem.created_at,
+            Location.latitude,
+            Location.longitude,
+            Location.address,
+            Problem.image_url,
+            Problem.vote_count,
+        )
+        .join(Status, Problem.status_id == Status.id)
+        .outerjoin(Location, Problem.location_id == Location.id)
+        .order_by(Problem.id)
+    )
+
+    # isti filteri kao GET /problems
+    if status:
+        query = query.filter(Status.name == status)
+    if search:
+        query, _ = match_problems(query, Problem.id, search)
+    # created_at je u bazi tekst u više oblika (server_default, import s "T"
+    # ili zonom), pa se obje strane normaliziraju SQLite datetime()
+    if since:
+        query = query.filter(func.datetime(Problem.created_at) >= func.datetime(_utc(since)))
+    if until:
+        query = query.filter(func.datetime(Problem.created_at) < func.datetime(_utc(until)))
+
+    filename = f"problems-{datetime.utcnow():%Y%m%d}.{format}"
+    body = _stream(query, format)
+    media_type = MEDIA_TYPES[format]
+    if gzip:
+        body, media_type, filename = _gzip(body), "application/gzip", filename + ".gz"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,42 @@
+import os
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from PIL import UnidentifiedImageError
+from database import get_async_db
+from models import Problem
+import storage
+from thumbnails import THUMB_FORMATS, snap_width, thumbnail_cache
+
+router = APIRouter(prefix="/images", tags=["Images"])
+
+
+@router.get("/{problem_id}")
+async def get_problem_image(
+    problem_id: int,
+    w: int = Query(640, ge=1, le=4096),
+    fmt: str = Query("webp", pattern="^(webp|jpeg)$"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # smanjena slika problema za liste i popupe na karti (vidi thumbnails.py)
+    row = (await db.execute(
+        select(Problem.image_path, Problem.image_url).where(Problem.id == problem_id)
+    )).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Problem not found")
+
+    src = row.image_path or (storage.backend.public_path(row.image_url) if row.image_url else None)
+    if not src or not os.path.isfile(src):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    try:
+        path = await thumbnail_cache.get(src, snap_width(w), fmt)
+    except (UnidentifiedImageError, OSError):
+        raise HTTPException(status_code=422, detail="Slika se ne može obraditi")
+
+    return FileResponse(
+        path,
+        media_type=THUMB_FORMATS[fmt],
+        headers={"Cache-Control": "public, max-age=86400"},
+    )
@@ -0,0 +1,121 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+from models import Problem, Status, Location, MapCluster
+from spatial import parse_bbox, within_bbox
+from clusters import MAX_CLUSTER_ZOOM, tile_for
+
+router = APIRouter(prefix="/map", tags=["Map"])
+
+# ispod ovog zooma viewport pokriva veliki dio grada pa vraćamo
+# najviše LOW_ZOOM_MAX_POINTS najnovijih točaka
+MIN_FULL_ZOOM = 12
+LOW_ZOOM_MAX_POINTS = 500
+
+
+def _coord(value):
+    # stare lokacije imaju koordinate spremljene kao tekst
+    return float(value) if value not in (None, "") else None
+
+
+@router.get("/problems")
+async def get_map_problems(
+    bbox: str | None = Query(None, description="min_lng,min_lat,max_lng,max_lat"),
+    zoom: int | None = Query(None, ge=0, le=22),
+    db: AsyncSession = Depends(get_async_db)
+):
+    query = (
+        select(
+            Problem.id,
+            Problem.title,
+            Location.latitude,
+            Location.longitude,
+            Status.name
+        )
+        .join(Status, Problem.status_id == Status.id)
+        .join(Location, Problem.location_id == Location.id)
+        .filter(Status.name != "resolved")
+    )
+
+    if bbox:
+        try:
+            query = within_bbox(query, Location.id, parse_bbox(bbox))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid bbox")
+
+    if zoom is not None and zoom < MIN_FULL_ZOOM:
+        query = query.order_by(Problem.created_at.desc()).limit(LOW_ZOOM_MAX_POINTS)
+
+    return ORJSONResponse([
+        {
+            "id": id,
+            "title": title,
+            "lat": _coord(lat),
+            "lng": _coord(lng),
+            "status": status
+        }
+        for id, title, lat, lng, status in (await db.execute(query)).all()
+    ])
+
+
+@router.get("/clusters")
+async def get_map_clusters(
+    bbox: str = Query(..., description="min_lng,min_lat,max_lng,max_lat"),
+    zoom: int = Query(..., ge=0, le=22),
+    include_resolved: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        min_lng, min_lat, max_lng, max_lat = parse_bbox(bbox)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid bbox")
+
+    zoom = min(zoom, MAX_CLUSTER_ZOOM)
+    # y tile raste prema jugu
+    min_x, min_y = tile_for(max_lat, min_lng, zoom)
+    max_x, max_y = tile_for(min_lat, max_lng, zoom)
+
+    query = (
+        select(
+            MapCluster.tile_x,
+            MapCluster.tile_y,
+            Status.name,
+            MapCluster.count,
+            MapCluster.lat_sum,
+            MapCluster.lng_sum
+        )
+        .join(Status, MapCluster.status_id == Status.id)
+        .filter(
+            MapCluster.zoom == zoom,
+            MapCluster.tile_x.between(min_x, max_x),
+            MapCluster.tile_y.between(min_y, max_y),
+            MapCluster.count > 0
+        )
+    )
+    if not include_resolved:
+        query = query.filter(Status.name != "resolved")
+
+    tiles = {}
+    for x, y, status, count, lat_sum, lng_sum in (await db.execute(query)).all():
+        tile = tiles.setdefault((x, y), {"count": 0, "lat_sum": 0.0, "lng_sum": 0.0, "statuses": {}})
+        tile["count"] += count
+        tile["lat_sum"] += lat_sum
+        tile["lng_sum"] += lng_sum
+        tile["statuses"][status] = count
+
+    return {
+        "zoom": zoom,
+        "clusters": [
+            {
+                "tile_x": x,
+                "tile_y": y,
+                "count": t["count"],
+                "lat": t["lat_sum"] / t["count"],
+                "lng": t["lng_sum"] / t["count"],
+                "statuses": t["statuses"]
+            }
+            for (x, y), t in tiles.items()
+        ]
+    }
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from models import User
+from auth import get_current_user
+from metrics import render_metrics
+
+router = APIRouter(tags=["Admin - Metrics"])
+
+def admin_required(current_user: User = Depends(get_current_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin access only")
+    return current_user
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics(current_user: User = Depends(admin_required)):
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
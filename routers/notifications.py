@@ -1,39 +1,200 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from database import get_db
+import asyncio
+import os
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import select, update, type_coerce, String
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db, AsyncReadSessionLocal
 from models import Notification, User
-from auth import get_current_user
-from schemas import NotificationOut
+from auth import get_current_user_async
+from schemas import NotificationPage, UnreadCount, NotificationSettings
+from write_queue import write_queue
+from serialization import NOTIFICATION_COLUMNS, row_dicts
+from pagination import encode_cursor, decode_cursor, keyset_filter
+import notify
 
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
 
-@router.get("/", response_model=list[NotificationOut])
-def get_notifications(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+# komentar svakih SSE_KEEPALIVE sekundi da proxy ne zatvori tihu vezu
+SSE_KEEPALIVE = float(os.getenv("SSE_KEEPALIVE", "15"))
+# koliko propuštenih notifikacija se najviše šalje nakon reconnecta
+SSE_REPLAY_LIMIT = 100
+
+@router.get("/", response_model=NotificationPage)
+async def get_notifications(
+    cursor: str | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    unread_only: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
-    return (
-        db.query(Notification)
-        .filter(Notification.user_id == current_user.id)
-        .order_by(Notification.created_at.desc())
-        .all()
+    # KEYSET PAGINACIJA PO (created_at, id), indeks ix_notifications_user_created_at_id
+    keys = [
+        type_coerce(Notification.created_at, String).label("cursor_created_at"),
+        Notification.id
+    ]
+    query = (
+        select(*NOTIFICATION_COLUMNS, keys[0])
+        .where(Notification.user_id == current_user.id)
+        .order_by(*[k.desc() for k in keys])
+    )
+    if unread_only:
+        query = query.where(Notification.is_read.isnot(True))
+    if cursor:
+        try:
+            query = query.where(keyset_filter(keys, decode_cursor(cursor, 2), descending=True))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    next_cursor = encode_cursor(rows[limit - 1].cursor_created_at, rows[limit - 1].id) if len(rows) > limit else None
+
+    items = row_dicts(rows[:limit])
+    for item in items:
+        del item["cursor_created_at"]
+    return ORJSONResponse({"limit": limit, "next_cursor": next_cursor, "items": items})
+
+
+@router.get("/unread-count", response_model=UnreadCount)
+async def get_unread_count(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    # brojač održavaju triggeri (counters.py), ovo je lookup po PK
+    unread = await db.scalar(select(User.unread_notifications).where(User.id == current_user.id))
+    return {"unread": unread or 0}
+
+
+async def _mark_read(user_id: int, ids: list[int] | None = None):
+    # jedan UPDATE za sve; triggeri usput smanjuju unread_notifications
+    stmt = (
+        update(Notification)
+        .where(Notification.user_id == user_id, Notification.is_read.isnot(True))
+        .values(is_read=True)
+        .execution_options(synchronize_session=False)
     )
+    if ids is not None:
+        stmt = stmt.where(Notification.id.in_(ids))
+
+    async def write(db: AsyncSession):
+        return (await db.execute(stmt)).rowcount
+
+    return await write_queue.submit(write)
+
+
+@router.get("/settings", response_model=NotificationSettings)
+async def get_settings(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    digest = await db.scalar(select(User.notification_digest).where(User.id == current_user.id))
+    return {"digest": bool(digest)}
+
+
+@router.put("/settings", response_model=NotificationSettings)
+async def update_settings(
+    data: NotificationSettings,
+    current_user: User = Depends(get_current_user_async)
+):
+    # digest: komentari i glasovi se skupljaju i stižu jednom dnevno (notify.send_digests)
+    async def write(db: AsyncSession):
+        await db.execute(
+            update(User).where(User.id == current_user.id).values(notification_digest=data.digest)
+        )
+
+    await write_queue.submit(write)
+    return data
+
+
+@router.post("/mark-all-read")
+async def mark_all_read(current_user: User = Depends(get_current_user_async)):
+    return {"updated": await _mark_read(current_user.id)}
+
+
+@router.post("/mark-read")
+async def mark_read(
+    ids: list[int] = Query(..., min_length=1, max_length=500),
+    current_user: User = Depends(get_current_user_async)
+):
+    return {"updated": await _mark_read(current_user.id, ids)}
 
 
 @router.patch("/{notification_id}/read")
-def mark_as_read(
+async def mark_as_read(
     notification_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_async)
 ):
-    n = (
-        db.query(Notification)
-        .filter(Notification.id == notification_id, Notification.user_id == current_user.id)
-        .first()
-    )
-    if not n:
-        return {"message": "Not found"}
+    async def write(db: AsyncSession):
+        n = await db.scalar(
+            select(Notification)
+            .where(Notification.id == notification_id, Notification.user_id == current_user.id)
+        )
+        if n:
+            n.is_read = True
+        return n is not None
 
-    n.is_read = True
-    db.commit()
+    if not await write_queue.submit(write):
+        return {"message": "Not found"}
     return {"message": "Marked as read"}
+
+
+def _sse(payload):
+    # SSE id je version, ne id retka: spojena notifikacija zadrži id, a
+    # dobije novu verziju, pa je Last-Event-ID ne preskoči
+    return b"id: %d\nevent: notification\ndata: %s\n\n" % (payload["version"], orjson.dumps(payload))
+
+
+@router.get("/stream")
+async def stream_notifications(
+    token: str | None = Query(None, description="JWT, za EventSource koji ne šalje headere"),
+    authorization: str | None = Header(None),
+    last_event_id: int | None = Header(None),
+):
+    """
+    Server-Sent Events: nove i spojene notifikacije stižu odmah, bez
+    pollanja. Nakon reconnecta (Last-Event-ID) prvo se pošalju sve koje su
+    u međuvremenu nastale ili promijenjene.
+    """
+    if token is None and authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    # sesija samo za auth i replay, ne drži se otvorena dok traje stream
+    async with AsyncReadSessionLocal() as db:
+        current_user = await get_current_user_async(token, db)
+
+    async def events():
+        # pretplata prije replaya, da se ne izgubi ništa što stigne između
+        async with notify.broker.subscribe(current_user.id) as subscription:
+            yield b"retry: 5000\n\n"
+            replayed = last_event_id or 0
+            if last_event_id is not None:
+                async with AsyncReadSessionLocal() as db:
+                    missed = row_dicts(await db.execute(
+                        select(*NOTIFICATION_COLUMNS, Notification.version)
+                        .where(Notification.user_id == current_user.id, Notification.version > last_event_id)
+                        .order_by(Notification.version)
+                        .limit(SSE_REPLAY_LIMIT)
+                    ))
+                for payload in missed:
+                    replayed = payload["version"]
+                    yield _sse(payload)
+
+            while True:
+                try:
+                    payload = await asyncio.wait_for(subscription.get(), SSE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if payload is None:
+                    return
+                if payload["version"] > replayed:   # inače već poslano kroz replay
+                    yield _sse(payload)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, UploadFile, File, Form
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, func
-import os, uuid, shutil
-from database import get_db
-from models import Problem, Status, User, ProblemVote, Location
-from auth import get_current_user
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Query
+from sqlalchemy.orm import contains_eager
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, type_coerce, String
+from database import get_async_db
+from models import Problem, Status, User, Location
+from auth import get_current_user_async
+from clusters import add_to_clusters
+from storage import save_upload, register_blob
+from ingest import ingest_queue
+from response_cache import invalidate
+from fulltext import match_problems, bm25_rank
+from pagination import encode_cursor, decode_cursor, keyset_filter, cached_count
 
 router = APIRouter()
 
@@ -13,21 +19,15 @@ async def create_problem(
     title: str = Form(...),
     description: str = Form(...),
     file: UploadFile | None = File(None),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     filename = None
 
     if file:
-        upload_dir = "uploads"
-        os.makedirs(upload_dir, exist_ok=True)
-
-        ext = file.filename.split(".")[-1]
-        filename = f"{uuid.uuid4()}.{ext}"
-        path = f"{upload_dir}/{filename}"
-
-        with open(path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        upload = await save_upload(file)
+        filename = upload.key
+        await db.execute(register_blob(upload))
 
     problem = Problem(
         title=title,
@@ -37,58 +37,85 @@ async def create_problem(
     )
 
     db.add(problem)
-    db.commit()
-    db.refresh(problem)
+    await db.run_sync(lambda s: add_to_clusters(s, problem))
+    await db.commit()
+    await db.refresh(problem)
+    invalidate("problems", "map")
 
+    if file and upload.created:
+        ingest_queue.submit(upload)
     return problem
 
 
 @router.get("/problems")
-def list_problems(
+async def list_problems(
     status: str | None = None,
     search: str | None = None,
-    sort: str | None = "new",
+    sort: str | None = None,
+    cursor: str | None = None,
     page: int = 1,
-    limit: int = 10,
-    db: Session = Depends(get_db)
+    limit: int = Query(10, ge=1, le=100),
+    with_total: bool = False,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(Problem).join(Status).join(Location)
+    # status i location su već u JOIN-u, pa ih punimo iz istog upita
+    query = (
+        select(Problem)
+        .join(Status)
+        .join(Location)
+        .options(contains_eager(Problem.status), contains_eager(Problem.location))
+    )
 
     # filter by status
     if status:
         query = query.filter(Status.name == status)
 
-    # search in title + description
+    # full-text search in title + description (FTS5, vidi fulltext.py)
+    matched = False
     if search:
-        query = query.filter(
-            or_(
-                Problem.title.ilike(f"%{search}%"),
-                Problem.description.ilike(f"%{search}%")
-            )
-        )
-
-    # sorting
-    if sort == "new":
-        query = query.order_by(Problem.created_at.desc())
+        query, matched = match_problems(query, Problem.id, search)
+
+    total = await cached_count(("problems", status, search), db, query) if with_total else None
+
+    # sorting – svaki sort ima jedinstven ključ (…, id) za keyset paginaciju;
+    # created_at se uspoređuje kao spremljeni tekst da cursor točno odgovara retku
+    created = type_coerce(Problem.created_at, String).label("cursor_created_at")
+    if sort is None:
+        sort = "relevance" if matched else "new"
+
+    if sort == "relevance" and matched:
+        keys, descending = [bm25_rank(), Problem.id], False
     elif sort == "old":
-        query = query.order_by(Problem.created_at.asc())
+        keys, descending = [created, Problem.id], False
     elif sort == "votes":
-        query = (
-            query
-            .outerjoin(ProblemVote)
-            .group_by(Problem.id)
-            .order_by(func.count(ProblemVote.id).desc())
-        )
+        keys, descending = [Problem.vote_count, Problem.id], True
     elif sort == "status":
-        query = query.order_by(Status.name.asc())
+        keys, descending = [Status.name, Problem.id], False
+    else:
+        keys, descending = [created, Problem.id], True
 
-    total = query.count()
-    problems = query.offset((page - 1) * limit).limit(limit).all()
+    query = query.add_columns(*keys).order_by(
+        *[k.desc() if descending else k.asc() for k in keys]
+    )
+
+    if cursor:
+        try:
+            values = decode_cursor(cursor, len(keys))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(keyset_filter(keys, values, descending))
+    elif page > 1:
+        # stari klijenti bez cursora
+        query = query.offset((page - 1) * limit)
+
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    next_cursor = encode_cursor(*rows[limit - 1][1:]) if len(rows) > limit else None
 
     return {
         "page": page,
         "limit": limit,
         "total": total,
+        "next_cursor": next_cursor,
         "items": [
             {
                 "id": p.id,
@@ -98,30 +125,8 @@ def list_problems(
                 "lng": p.location.longitude if p.location else None,
                 "status": p.status.name if p.status else None,
                 "created_at": p.created_at,
-                "votes": len(p.votes)
+                "votes": p.vote_count
             }
-            for p in problems
+            for p, *_ in rows[:limit]
         ]
     }
-
-
-@router.get("/map/problems")
-def get_map_problems(db: Session = Depends(get_db)):
-    problems = (
-        db.query(Problem)
-        .join(Status)
-        .join(Location)
-        .filter(Status.name != "resolved")
-        .all()
-    )
-
-    return [
-        {
-            "id": p.id,
-            "title": p.title,
-            "lat": p.location.latitude,
-            "lng": p.location.longitude,
-            "status": p.status.name
-        }
-        for p in problems
-    ]
@@ -1,8 +1,7 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
 from database import get_db
-from models import User, Problem, ProblemVote
+from models import User, Problem
 from auth import get_current_user
 
 router = APIRouter(prefix="/profile", tags=["Profile"])
@@ -13,13 +12,9 @@ def get_my_profile(
     current_user: User = Depends(get_current_user)
 ):
     problems = (
-        db.query(
-            Problem,
-            func.count(ProblemVote.id).label("votes")
-        )
-        .outerjoin(ProblemVote)
+        db.query(Problem)
+        .options(joinedload(Problem.status))
         .filter(Problem.user_id == current_user.id)
-        .group_by(Problem.id)
         .all()
     )
 
@@ -31,10 +26,10 @@ def get_my_profile(
             {
                 "id": p.id,
                 "title": p.title,
-                "votes": votes,
+                "votes": p.vote_count,
                 "status": p.status.name,
                 "created_at": p.created_at
             }
-            for p, votes in problems
+            for p in problems
         ]
     }
@@ -1,42 +1,54 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload
 from database import get_db
 from models import User, Problem, SavedProblem
-from auth import get_current_user
+from auth import get_current_user, get_current_user_async
+from write_queue import write_queue
 
 router = APIRouter(prefix="/saved", tags=["Saved Problems"])
 
 # ✅ Dodaj problem u favorites
 @router.post("/{problem_id}")
-def save_problem(problem_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    problem = db.query(Problem).filter_by(id=problem_id).first()
-    if not problem:
-        raise HTTPException(status_code=404, detail="Problem not found")
-
-    exists = db.query(SavedProblem).filter_by(user_id=current_user.id, problem_id=problem_id).first()
-    if exists:
-        raise HTTPException(status_code=400, detail="Problem already saved")
-
-    saved = SavedProblem(user_id=current_user.id, problem_id=problem_id)
-    db.add(saved)
-    db.commit()
+async def save_problem(problem_id: int, current_user: User = Depends(get_current_user_async)):
+    async def write(db):
+        problem = await db.get(Problem, problem_id)
+        if not problem:
+            raise HTTPException(status_code=404, detail="Problem not found")
+
+        exists = await db.scalar(select(SavedProblem.id).filter_by(user_id=current_user.id, problem_id=problem_id))
+        if exists:
+            raise HTTPException(status_code=400, detail="Problem already saved")
+
+        db.add(SavedProblem(user_id=current_user.id, problem_id=problem_id))
+
+    await write_queue.submit(write)
     return {"message": "Problem saved"}
 
 # ✅ Ukloni problem iz favorites
 @router.delete("/{problem_id}")
-def unsave_problem(problem_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    saved = db.query(SavedProblem).filter_by(user_id=current_user.id, problem_id=problem_id).first()
-    if not saved:
-        raise HTTPException(status_code=404, detail="Saved problem not found")
+async def unsave_problem(problem_id: int, current_user: User = Depends(get_current_user_async)):
+    async def write(db):
+        saved = await db.scalar(select(SavedProblem).filter_by(user_id=current_user.id, problem_id=problem_id))
+        if not saved:
+            raise HTTPException(status_code=404, detail="Saved problem not found")
+        await db.delete(saved)
 
-    db.delete(saved)
-    db.commit()
+    await write_queue.submit(write)
     return {"message": "Problem removed from saved"}
 
 # ✅ Lista svih spremljenih problema korisnika
 @router.get("/", response_model=list[dict])
 def list_saved_problems(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    saved = db.query(SavedProblem).filter_by(user_id=current_user.id).all()
+    saved = (
+        db.query(SavedProblem)
+        .options(
+            joinedload(SavedProblem.problem).joinedload(Problem.status),
+            joinedload(SavedProblem.problem).joinedload(Problem.location)
+        )
+        .filter_by(user_id=current_user.id)
+        .all()
+    )
     return [
         {
             "id": s.problem.id,
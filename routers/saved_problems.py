@@ -1,46 +1,49 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload
 from database import get_db
 from models import SavedProblem, Problem, User
-from auth import get_current_user
+from auth import get_current_user, get_current_user_async
+from write_queue import write_queue
 
 router = APIRouter(prefix="/saved", tags=["Saved Problems"])
 
 # Spremi problem
 @router.post("/{problem_id}")
-def save_problem(
+async def save_problem(
     problem_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_async)
 ):
-    existing = db.query(SavedProblem).filter(
-        SavedProblem.user_id == current_user.id,
-        SavedProblem.problem_id == problem_id
-    ).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="Problem already saved")
-
-    saved = SavedProblem(user_id=current_user.id, problem_id=problem_id)
-    db.add(saved)
-    db.commit()
+    async def write(db):
+        existing = await db.scalar(select(SavedProblem.id).where(
+            SavedProblem.user_id == current_user.id,
+            SavedProblem.problem_id == problem_id
+        ))
+        if existing:
+            raise HTTPException(status_code=400, detail="Problem already saved")
+
+        db.add(SavedProblem(user_id=current_user.id, problem_id=problem_id))
+
+    await write_queue.submit(write)
     return {"message": "Problem saved"}
 
 # Ukloni problem iz spremljenih
 @router.delete("/{problem_id}")
-def remove_saved_problem(
+async def remove_saved_problem(
     problem_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_async)
 ):
-    saved = db.query(SavedProblem).filter(
-        SavedProblem.user_id == current_user.id,
-        SavedProblem.problem_id == problem_id
-    ).first()
-    if not saved:
-        raise HTTPException(status_code=404, detail="Problem not found in saved list")
-
-    db.delete(saved)
-    db.commit()
+    async def write(db):
+        saved = await db.scalar(select(SavedProblem).where(
+            SavedProblem.user_id == current_user.id,
+            SavedProblem.problem_id == problem_id
+        ))
+        if not saved:
+            raise HTTPException(status_code=404, detail="Problem not found in saved list")
+
+        await db.delete(saved)
+
+    await write_queue.submit(write)
     return {"message": "Problem removed from saved list"}
 
 # Lista svih spremljenih problema
@@ -49,7 +52,12 @@ def list_saved_problems(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    saved = db.query(SavedProblem).filter(SavedProblem.user_id == current_user.id).all()
+    saved = (
+        db.query(SavedProblem)
+        .options(joinedload(SavedProblem.problem).joinedload(Problem.status))
+        .filter(SavedProblem.user_id == current_user.id)
+        .all()
+    )
     return [
         {
             "id": s.problem.id,
@@ -1,22 +1,24 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from database import get_db
-from models import Problem, ProblemVote
+from models import Problem, TrendingProblem
+from ranking import TOP_K
 
 router = APIRouter(prefix="/trending", tags=["Trending"])
 
 @router.get("/")
-def get_trending_problems(db: Session = Depends(get_db)):
+def get_trending_problems(
+    window: str = Query("7d", pattern="^(24h|7d|30d)$"),
+    limit: int = Query(5, ge=1, le=TOP_K),
+    db: Session = Depends(get_db)
+):
+    # jedan indeksirani read iz materijaliziranog top-K (vidi ranking.py)
     results = (
-        db.query(
-            Problem,
-            func.count(ProblemVote.id).label("votes")
-        )
-        .outerjoin(ProblemVote)
-        .group_by(Problem.id)
-        .order_by(func.count(ProblemVote.id).desc())
-        .limit(5)
+        db.query(Problem, TrendingProblem.score)
+        .join(TrendingProblem, TrendingProblem.problem_id == Problem.id)
+        .filter(TrendingProblem.period == window)
+        .order_by(TrendingProblem.score.desc())
+        .limit(limit)
         .all()
     )
 
@@ -25,8 +27,9 @@ def get_trending_problems(db: Session = Depends(get_db)):
             "id": p.id,
             "title": p.title,
             "description": p.description,
-            "votes": votes,
+            "votes": p.vote_count,
+            "score": score,
             "created_at": p.created_at
         }
-        for p, votes in results
+        for p, score in results
     ]
@@ -1,38 +1,49 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from models import Problem, ProblemVote, User
-from auth import get_current_user
+from auth import get_current_user_async
 from schemas import VoteOut
+from ranking import update_trending
+from write_queue import write_queue
+from response_cache import invalidate
+import notify
 
 router = APIRouter(prefix="/problems", tags=["Votes"])
 
 @router.post("/{problem_id}/vote", response_model=VoteOut)
-def vote_problem(
+async def vote_problem(
     problem_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_async)
 ):
-    problem = db.query(Problem).filter(Problem.id == problem_id).first()
-    if not problem:
-        raise HTTPException(status_code=404, detail="Problem not found")
-
-    existing = (
-        db.query(ProblemVote)
-        .filter(
-            ProblemVote.user_id == current_user.id,
-            ProblemVote.problem_id == problem_id
+    async def write(db: AsyncSession):
+        problem = await db.get(Problem, problem_id)
+        if not problem:
+            raise HTTPException(status_code=404, detail="Problem not found")
+
+        existing = await db.scalar(
+            select(ProblemVote.id)
+            .where(
+                ProblemVote.user_id == current_user.id,
+                ProblemVote.problem_id == problem_id
+            )
         )
-        .first()
-    )
 
-    if existing:
-        raise HTTPException(status_code=400, detail="Already voted")
+        if existing:
+            raise HTTPException(status_code=400, detail="Already voted")
+
+        db.add(ProblemVote(user_id=current_user.id, problem_id=problem_id))
+
+        note = None
+        if problem.user_id is not None and problem.user_id != current_user.id:
+            note = await db.run_sync(notify.add_notification, problem.user_id, problem, "vote")
 
-    vote = ProblemVote(user_id=current_user.id, problem_id=problem_id)
-    db.add(vote)
-    db.commit()
+        await db.run_sync(lambda s: update_trending(s, problem_id))
 
-    total = db.query(ProblemVote).filter(ProblemVote.problem_id == problem_id).count()
+        # vote_count je povećan triggerom u istoj transakciji
+        return await db.scalar(select(Problem.vote_count).where(Problem.id == problem_id)), note
 
-    return {"problem_id": problem_id, "votes": total}
+    votes, note = await write_queue.submit(write)
+    invalidate("trending")
+    notify.publish(note)
+    return {"problem_id": problem_id, "votes": votes}
@@ -34,6 +34,20 @@ class ProblemCreate(BaseModel):
     longitude: Optional[float] = None
     address: Optional[str] = None
 
+class ProblemImportRow(ProblemCreate):
+    """Jedan zapis za bulk import (vidi bulk_import.py)."""
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
+    status: str = "open"
+    created_at: Optional[datetime] = None
+    image_path: str = ""
+
+class ImportReport(BaseModel):
+    inserted: int
+    failed: int
+    errors: list[dict]
+    errors_truncated: bool
+
 # ----------------------------
 # FORM DEPENDENCY
 # ----------------------------
@@ -86,6 +100,13 @@ class ProblemResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class ProblemPage(BaseModel):
+    page: int
+    limit: int
+    total: Optional[int]
+    next_cursor: Optional[str]
+    items: list[ProblemResponse]
+
 class ProblemListOut(BaseModel):
     id: int
     title: str
@@ -118,6 +139,18 @@ class NotificationOut(BaseModel):
     message: str
     is_read: bool
     created_at: datetime
+    count: int = 1
 
     class Config:
         from_attributes = True
+
+class NotificationPage(BaseModel):
+    limit: int
+    next_cursor: Optional[str]
+    items: list[NotificationOut]
+
+class UnreadCount(BaseModel):
+    unread: int
+
+class NotificationSettings(BaseModel):
+    digest: bool
@@ -0,0 +1,52 @@
+from models import Comment, Notification, Problem, Status, User
+
+# ---------------------------
+# BRZA SERIJALIZACIJA LISTI
+# ---------------------------
+# Velike liste ne idu kroz response_model kao ORM objekti (Pydantic validira
+# svaki objekt, a zatim ga json modul kodira), nego se retci iz SELECT-a
+# slažu u dictove i orjson ih izravno pretvara u bajtove. Ruta i dalje ima
+# response_model, pa je OpenAPI shema ista; FastAPI ga ne primjenjuje kad
+# endpoint vrati Response.
+
+# stupci za schemas.ProblemResponse
+PROBLEM_COLUMNS = (
+    Problem.id,
+    Problem.title,
+    Problem.description,
+    Problem.image_path,
+    Problem.created_at,
+    Problem.image_url,
+    Status.name.label("status_name"),
+)
+
+# stupci za schemas.CommentOut (uz JOIN na users)
+COMMENT_COLUMNS = (Comment.id, Comment.text, Comment.created_at, User.username)
+
+# stupci za schemas.NotificationOut
+NOTIFICATION_COLUMNS = (
+    Notification.id,
+    Notification.message,
+    Notification.is_read,
+    Notification.created_at,
+    Notification.count,
+)
+
+
+def problem_dicts(rows):
+    return [
+        {
+            "id": r.id,
+            "title": r.title,
+            "description": r.description,
+            "image_path": r.image_path,
+            "created_at": r.created_at,
+            "image_url": r.image_url,
+            "status": {"name": r.status_name},
+        }
+        for r in rows
+    ]
+
+
+def row_dicts(rows):
+    return [dict(r._mapping) for r in rows]
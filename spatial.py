@@ -0,0 +1,103 @@
+from sqlalchemy import text, table, column
+
+# R*Tree nad koordinatama lokacija. Svaka lokacija je točka pa je
+# min == max; triggeri na "locations" drže indeks usklađenim sa svim
+# upisima (ORM, seed, ručni SQL).
+location_rtree = table(
+    "location_rtree",
+    column("id"),
+    column("min_lat"),
+    column("max_lat"),
+    column("min_lng"),
+    column("max_lng"),
+)
+
+_HAS_COORDS = "{row}.latitude IS NOT NULL AND {row}.longitude IS NOT NULL " \
+              "AND {row}.latitude != '' AND {row}.longitude != ''"
+
+SPATIAL_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS location_rtree USING rtree(
+        id, min_lat, max_lat, min_lng, max_lng
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS locations_rtree_insert
+    AFTER INSERT ON locations
+    WHEN {_HAS_COORDS.format(row="new")}
+    BEGIN
+        INSERT OR REPLACE INTO location_rtree
+        VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS locations_rtree_update
+    AFTER UPDATE OF latitude, longitude ON locations
+    BEGIN
+        DELETE FROM location_rtree WHERE id = old.id;
+        INSERT INTO location_rtree
+        SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude
+        WHERE {_HAS_COORDS.format(row="new")};
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS locations_rtree_delete
+    AFTER DELETE ON locations
+    BEGIN
+        DELETE FROM location_rtree WHERE id = old.id;
+    END
+    """,
+]
+
+
+def create_spatial_index(engine):
+    """
+    Kreira R*Tree indeks i triggere ako ne postoje. Kod prvog kreiranja
+    puni indeks iz postojećih lokacija (stare baze imaju koordinate
+    spremljene kao tekst pa ih CAST pretvara u brojeve).
+    """
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'location_rtree'")
+        ).first()
+
+        for ddl in SPATIAL_DDL:
+            conn.execute(text(ddl))
+
+        if not exists:
+            conn.execute(text(
+                "INSERT INTO location_rtree "
+                "SELECT id, CAST(latitude AS REAL), CAST(latitude AS REAL), "
+                "CAST(longitude AS REAL), CAST(longitude AS REAL) "
+                f"FROM locations WHERE {_HAS_COORDS.format(row='locations')}"
+            ))
+
+
+def parse_bbox(bbox: str):
+    """
+    Parsira "min_lng,min_lat,max_lng,max_lat" (redoslijed kao u GeoJSON-u).
+    Vraća (min_lng, min_lat, max_lng, max_lat) ili baca ValueError.
+    """
+    parts = [float(p) for p in bbox.split(",")]
+    if len(parts) != 4:
+        raise ValueError("bbox mora imati 4 vrijednosti")
+
+    min_lng, min_lat, max_lng, max_lat = parts
+    if min_lat > max_lat or min_lng > max_lng:
+        raise ValueError("bbox min vrijednosti moraju biti manje od max")
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def within_bbox(query, location_id_col, bbox):
+    """Ograničava query na lokacije unutar bbox-a preko R*Tree indeksa."""
+    min_lng, min_lat, max_lng, max_lat = bbox
+    return (
+        query
+        .join(location_rtree, location_rtree.c.id == location_id_col)
+        .filter(
+            location_rtree.c.max_lat >= min_lat,
+            location_rtree.c.min_lat <= max_lat,
+            location_rtree.c.max_lng >= min_lng,
+            location_rtree.c.min_lng <= max_lng,
+        )
+    )
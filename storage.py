@@ -0,0 +1,445 @@
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+import anyio
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse, Response
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse
+from sqlalchemy import delete, or_, select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from database import engine as default_engine
+from models import ImageBlob
+from validators import MAX_FILE_SIZE, sniff_image_type
+
+UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", "uploads")
+
+# ---------------------------
+# BACKENDI
+# ---------------------------
+# Slike se spremaju pod ključem "ab/cd/<sha256>.<ext>", pa se ista slika
+# uploadana više puta sprema samo jednom. Backend zna samo za ključeve;
+# tko ih koristi i koliko puta, vodi se u image_blobs (refcount).
+class StorageBackend(ABC):
+    """
+    Sučelje za spremište slika. Metode su blokirajuće; save_upload i
+    collect_garbage ih zovu kroz worker thread.
+    """
+
+    # gdje save_upload slaže datoteku dok je ne primi cijelu
+    staging_dir = tempfile.gettempdir()
+
+    @abstractmethod
+    def put(self, local_path: str, key: str) -> bool:
+        """Premješta local_path pod key. Vraća False ako je key već postojao."""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    def age(self, key: str) -> float:
+        """Sekunde od zadnjeg put() za ovaj ključ."""
+
+    @abstractmethod
+    def keys(self):
+        ...
+
+    @abstractmethod
+    def public_path(self, key: str) -> str:
+        """Vrijednost koja ide u Problem.image_path."""
+
+
+class LocalBackend(StorageBackend):
+    def __init__(self, root: str = UPLOAD_FOLDER):
+        self.root = root
+        self.staging_dir = os.path.join(root, ".staging")
+        os.makedirs(self.staging_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, key)
+
+    def put(self, local_path, key):
+        path = self._path(key)
+        if os.path.exists(path):
+            os.remove(local_path)
+            # osvježi mtime da je collect_garbage ne obriše prije nego
+            # novi problem poveća refcount
+            os.utime(path)
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(local_path, path)
+        return True
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def age(self, key):
+        return time.time() - os.path.getmtime(self._path(key))
+
+    def keys(self):
+        # samo shardovi ("ab/cd/..."), ne stari uploadi u korijenu ni .staging
+        for first in os.listdir(self.root):
+            first_dir = os.path.join(self.root, first)
+            if len(first) != 2 or not os.path.isdir(first_dir):
+                continue
+            for second in os.listdir(first_dir):
+                for name in os.listdir(os.path.join(first_dir, second)):
+                    yield f"{first}/{second}/{name}"
+
+    def public_path(self, key):
+        return f"{self.root}/{key}"
+
+
+backend = LocalBackend()
+
+
+def set_backend(new_backend: StorageBackend):
+    global backend
+    backend = new_backend
+
+
+def blob_key(sha256: str, ext: str) -> str:
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}.{ext}"
+
+
+# ---------------------------
+# SPREMANJE UPLOADA
+# ---------------------------
+# Upload se čita i zapisuje u komadima kroz anyio (čitanje i pisanje na disk
+# idu u worker thread), pa velika slika s mobitela ne blokira event loop.
+# Usput se računa sha256 i provjeravaju magic bytes; čim se prijeđe
+# MAX_FILE_SIZE, djelomična datoteka se briše i zahtjev odbija.
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(256 * 1024)))
+
+# multipart tijelo smije biti malo veće od same slike (polja forme, granice)
+MAX_REQUEST_BODY = MAX_FILE_SIZE + 1024 * 1024
+# veći limit samo za admin bulk import (vidi bulk_import.py)
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(200 * 1024 * 1024)))
+REQUEST_BODY_LIMITS = {"/admin/problems/import": IMPORT_MAX_BYTES}
+
+
+@dataclass(frozen=True)
+class StoredUpload:
+    key: str
+    path: str
+    size: int
+    sha256: str
+    ext: str
+    created: bool   # False ako je ista slika već bila spremljena
+
+
+async def save_upload(file, store: StorageBackend = None, engine=default_engine) -> StoredUpload:
+    """
+    Sprema UploadFile u store (zadano: storage.backend) pod ključem prema
+    sadržaju. Diže HTTPException(400) ako datoteka nije slika ili je veća
+    od MAX_FILE_SIZE. Pozivatelj mora u istoj transakciji kao i problem
+    izvršiti register_blob(upload).
+    """
+    store = store or backend
+    tmp_path = os.path.join(store.staging_dir, f"{uuid.uuid4().hex}.part")
+
+    digest = hashlib.sha256()
+    size = 0
+    ext = None
+    try:
+        async with await anyio.open_file(tmp_path, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                if ext is None:
+                    ext = sniff_image_type(chunk[:12])
+                    if ext is None:
+                        raise HTTPException(400, "Dozvoljene su samo slike")
+
+                size += len(chunk)
+                if size > MAX_FILE_SIZE:
+                    raise HTTPException(400, "Slika je prevelika (max 5MB)")
+
+                digest.update(chunk)
+                await out.write(chunk)
+
+        if ext is None:
+            raise HTTPException(400, "Slika nije odabrana")
+
+        sha256 = digest.hexdigest()
+        key = blob_key(sha256, ext)
+        path = store.public_path(key)
+        created = await anyio.to_thread.run_sync(
+            put_pinned, store, tmp_path, key, path, size, False, engine
+        )
+    except BaseException:
+        await anyio.to_thread.run_sync(_remove_if_exists, tmp_path)
+        raise
+
+    return StoredUpload(
+        key=key, path=path, size=size,
+        sha256=sha256, ext=ext, created=created,
+    )
+
+
+def _remove_if_exists(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def put_pinned(store: StorageBackend, local_path: str, key: str, path: str, size: int,
+               normalized: bool = False, engine=default_engine) -> bool:
+    """
+    store.put() nakon što je redak u image_blobs upisan ili osvježen
+    (pinned_at). collect_garbage briše redak i datoteku u istoj transakciji,
+    pa je ili pin stigao prvi i GC sliku preskače, ili je GC već obrisao
+    datoteku i put() je sprema iznova.
+    """
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(
+            sqlite_insert(ImageBlob)
+            .values(key=key, path=path, size=size, normalized=normalized, pinned_at=now)
+            .on_conflict_do_update(index_elements=["key"], set_={"pinned_at": now})
+        )
+    return store.put(local_path, key)
+
+
+def register_blob(upload: StoredUpload, normalized: bool = False):
+    """INSERT u image_blobs (ako ga već nema); izvršiti prije inserta problema."""
+    return (
+        sqlite_insert(ImageBlob)
+        .values(key=upload.key, path=upload.path, size=upload.size, normalized=normalized)
+        .on_conflict_do_nothing(index_elements=["key"])
+    )
+
+
+# ---------------------------
+# REFCOUNT
+# ---------------------------
+# Problem se na sliku veže preko image_path (main.py, main1.py) ili
+# image_url (routers/problems.py), pa triggeri broje oba.
+BLOB_REFCOUNT_DDL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS problems_blob_ref_insert
+    AFTER INSERT ON problems
+    BEGIN
+        UPDATE image_blobs SET refcount = refcount + 1
+        WHERE path = new.image_path OR key = new.image_url;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS problems_blob_ref_delete
+    AFTER DELETE ON problems
+    BEGIN
+        UPDATE image_blobs SET refcount = refcount - 1
+        WHERE path = old.image_path OR key = old.image_url;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS problems_blob_ref_update
+    AFTER UPDATE OF image_path, image_url ON problems
+    BEGIN
+        UPDATE image_blobs SET refcount = refcount - 1
+        WHERE path = old.image_path OR key = old.image_url;
+        UPDATE image_blobs SET refcount = refcount + 1
+        WHERE path = new.image_path OR key = new.image_url;
+    END
+    """,
+]
+
+
+def _recount(conn):
+    return conn.execute(text(
+        """
+        UPDATE image_blobs SET refcount = (
+            SELECT COUNT(*) FROM problems
+            WHERE problems.image_path = image_blobs.path OR problems.image_url = image_blobs.key
+        )
+        WHERE refcount IS NOT (
+            SELECT COUNT(*) FROM problems
+            WHERE problems.image_path = image_blobs.path OR problems.image_url = image_blobs.key
+        )
+        """
+    )).rowcount
+
+
+def create_blob_refcounts(engine):
+    """Kreira triggere; kod prvog kreiranja preračunava refcount postojećih slika."""
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'problems_blob_ref_insert'")
+        ).first()
+
+        for ddl in BLOB_REFCOUNT_DDL:
+            conn.execute(text(ddl))
+
+        if not exists:
+            _recount(conn)
+
+
+# ---------------------------
+# GARBAGE COLLECTION
+# ---------------------------
+# Slike bez referenci (obrisani problemi, neuspjeli create_problem) brišu
+# se tek nakon BLOB_GC_GRACE sekundi od zadnjeg put() i zadnjeg pina (vidi
+# put_pinned), da se ne obriše slika koju upravo dijeli novi upload čiji
+# problem još nije commitan.
+BLOB_GC_GRACE = int(os.getenv("BLOB_GC_GRACE", "3600"))
+
+
+def collect_garbage(engine=default_engine, store: StorageBackend = None, grace=BLOB_GC_GRACE):
+    """Briše nereferencirane slike iz storea i image_blobs. Vraća broj obrisanih."""
+    store = store or backend
+    with engine.connect() as conn:
+        known = dict(conn.execute(select(ImageBlob.key, ImageBlob.refcount)).all())
+
+    candidates = [key for key, refcount in known.items() if refcount <= 0]
+    candidates += [key for key in store.keys() if key not in known]
+
+    removed = 0
+    for key in candidates:
+        if store.exists(key) and store.age(key) < grace:
+            continue
+        cutoff = datetime.utcnow() - timedelta(seconds=grace)
+        # datoteka se briše dok transakcija drži write lock, pa pin novog
+        # uploada čeka kraj brisanja i njegov put() zatim sprema datoteku
+        with engine.begin() as conn:
+            deleted = conn.execute(
+                delete(ImageBlob).where(
+                    ImageBlob.key == key,
+                    ImageBlob.refcount <= 0,
+                    or_(ImageBlob.pinned_at.is_(None), ImageBlob.pinned_at < cutoff),
+                )
+            ).rowcount
+            if not deleted and conn.scalar(select(ImageBlob.key).where(ImageBlob.key == key)):
+                continue  # u međuvremenu ju je netko referencirao ili pinao
+            store.delete(key)
+        removed += 1
+    return removed
+
+
+# ---------------------------
+# SERVIRANJE
+# ---------------------------
+# Content-addressed slike ("ab/cd/<sha256>.ext") nikad ne mijenjaju sadržaj,
+# pa ih klijenti i proxyji smiju držati godinu dana bez revalidacije, a
+# sha256 je ETag. Stari uploadi (ime datoteke od klijenta) se mogu
+# prepisati, pa se uvijek revalidiraju (If-None-Match -> 304).
+# Range zahtjeve rješava starletteov FileResponse; ako server podržava
+# ASGI "pathsend" ekstenziju, FileResponse je šalje bez kopiranja.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+_CONTENT_ADDRESSED = re.compile(r"(?:^|/)([0-9a-f]{2})/([0-9a-f]{2})/(\1\2[0-9a-f]{60})\.[a-z]+$")
+
+# Opcionalno: slanje datoteke prepušta se reverse proxyju (sendfile).
+# nginx: UPLOADS_SENDFILE_HEADER=X-Accel-Redirect, UPLOADS_SENDFILE_PREFIX
+# je internal location koja pokazuje na UPLOAD_FOLDER. X-Sendfile
+# (Apache, lighttpd) dobiva apsolutnu putanju.
+UPLOADS_SENDFILE_HEADER = os.getenv("UPLOADS_SENDFILE_HEADER", "")
+UPLOADS_SENDFILE_PREFIX = os.getenv("UPLOADS_SENDFILE_PREFIX", "/_uploads/")
+
+
+class UploadStaticFiles(StaticFiles):
+    """StaticFiles za /uploads s cache headerima prema tome je li URL content-addressed."""
+
+    def __init__(self, *args, sendfile_header=UPLOADS_SENDFILE_HEADER,
+                 sendfile_prefix=UPLOADS_SENDFILE_PREFIX, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sendfile_header = sendfile_header
+        self.sendfile_prefix = sendfile_prefix
+
+    async def get_response(self, path, scope):
+        # .staging i ostale skrivene datoteke nisu javne
+        if any(part.startswith(".") for part in re.split(r"[\\/]", path)):
+            raise HTTPException(status_code=404)
+        return await super().get_response(path, scope)
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        relative = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+        match = _CONTENT_ADDRESSED.search(relative)
+
+        if self.sendfile_header:
+            if self.sendfile_header.lower() == "x-sendfile":
+                target = os.path.abspath(full_path)
+            else:
+                target = self.sendfile_prefix + relative
+            response = Response(
+                status_code=status_code,
+                headers={self.sendfile_header: target},
+                media_type=mimetypes.guess_type(relative)[0] or "application/octet-stream",
+            )
+        else:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+
+        if match:
+            response.headers["etag"] = f'"{match.group(3)}"'
+        response.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL if match else REVALIDATE_CACHE_CONTROL
+        if "etag" in response.headers and self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+# ---------------------------
+# ASGI MIDDLEWARE
+# ---------------------------
+class BodySizeLimitMiddleware:
+    """
+    Prekida zahtjev čim tijelo prijeđe `max_bytes`, prije nego ga multipart
+    parser do kraja spremi u privremenu datoteku. Ako Content-Length već
+    najavljuje preveliko tijelo, odmah vraća 413 bez čitanja. `limits`
+    zadaje drugačiji limit za pojedine putanje.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_REQUEST_BODY, limits: dict = REQUEST_BODY_LIMITS):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        max_bytes = self.limits.get(scope["path"], self.max_bytes)
+        for key, value in scope["headers"]:
+            if key == b"content-length" and value.isdigit() and int(value) > max_bytes:
+                response = JSONResponse(status_code=413, content={"detail": "Zahtjev je prevelik"})
+                await response(scope, receive, send)
+                return
+
+        received = 0
+
+        async def receive_wrapper():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    raise HTTPException(413, "Zahtjev je prevelik")
+            return message
+
+        await self.app(scope, receive_wrapper, send)
+
+
+if __name__ == "__main__":
+    removed = collect_garbage()
+    print(f"✅ obrisano {removed} nereferenciranih slika")
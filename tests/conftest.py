@@ -0,0 +1,117 @@
+import os
+import sys
+import tempfile
+import uuid
+from contextlib import contextmanager
+
+import pytest
+
+# aplikacija čita konfiguraciju kod importa, pa okolina mora biti
+# postavljena prije prvog importa database/main1
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_TMP = tempfile.mkdtemp(prefix="repair_map_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP}/test.db"
+os.environ["ASYNC_DATABASE_URL"] = f"sqlite+aiosqlite:///{_TMP}/test.db"
+os.environ["UPLOAD_FOLDER"] = os.path.join(_TMP, "uploads")
+os.environ["THUMB_CACHE_DIR"] = os.path.join(_TMP, "thumb_cache")
+os.environ.setdefault("ARGON2_TIME_COST", "1")
+os.environ.setdefault("ARGON2_MEMORY_COST", "1024")
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    import main1
+
+    with TestClient(main1.app) as c:
+        # pozadinski taskovi (trending, retencija, sažeci) bi ulazili u
+        # brojanje upita, pa se u testovima gase
+        for name in ("trending_task", "retention_task", "digest_task"):
+            getattr(main1.app.state, name).cancel()
+        yield c
+
+
+@pytest.fixture
+def db(client):
+    from database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def make_user(client):
+    """Registrira korisnika i vraća (id, headers s Bearer tokenom)."""
+    from database import SessionLocal
+    from models import User
+
+    def make(prefix="user", admin=False):
+        username = f"{prefix}_{uuid.uuid4().hex[:10]}"
+        r = client.post("/register", json={"username": username, "password": "secret123"})
+        assert r.status_code == 200, r.text
+        with SessionLocal() as s:
+            user = s.query(User).filter_by(username=username).one()
+            if admin:
+                user.is_admin = 1
+                s.commit()
+            user_id = user.id
+        token = client.post("/login", data={"username": username, "password": "secret123"}).json()["access_token"]
+        return user_id, {"Authorization": f"Bearer {token}"}
+
+    return make
+
+
+@pytest.fixture
+def make_problems(db):
+    """Upisuje n problema s lokacijom i statusom "open"; vraća njihove id-eve."""
+    from models import Location, Problem, Status
+
+    def make(n, user_id=None, title="Rupa na cesti"):
+        status = db.query(Status).filter_by(name="open").one()
+        problems = []
+        for i in range(n):
+            location = Location(latitude=43.5 + i / 1000, longitude=16.4 + i / 1000, address=f"Ulica {i}")
+            db.add(location)
+            db.flush()
+            problems.append(Problem(
+                title=f"{title} {i}", description="Opis problema za test", image_path="",
+                user_id=user_id, status_id=status.id, location_id=location.id,
+            ))
+        db.add_all(problems)
+        db.flush()
+        ids = [p.id for p in problems]
+        # commit vraća jedinu writer konekciju; poslije se objekti ne čitaju
+        db.commit()
+        return ids
+
+    return make
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Provjera budžeta SQL naredbi za jedan zahtjev:
+
+        with query_budget(3):
+            client.get("/saved/", headers=headers)
+
+    Response cache se prazni da se mjeri pravi put do baze.
+    """
+    import response_cache
+    from database import count_queries
+
+    @contextmanager
+    def budget(limit):
+        response_cache.backend.clear()
+        with count_queries() as counter:
+            yield counter
+        assert counter["count"] <= limit, (
+            f"{counter['count']} SQL naredbi (budžet {limit}):\n" + "\n".join(counter["statements"])
+        )
+
+    return budget
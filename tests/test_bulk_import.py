@@ -0,0 +1,152 @@
+import io
+import json
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from fastapi.testclient import TestClient
+
+from bulk_import import import_problems
+from clusters import tile_for
+from database import Base
+from fulltext import create_search_index
+from models import Location, MapCluster, Problem, Status
+from spatial import create_spatial_index
+from storage import BodySizeLimitMiddleware, create_blob_refcounts
+
+
+@pytest.fixture
+def bind(tmp_path):
+    """Prazna baza s istim triggerima kao aplikacija (kao benchmarks/bench_import.py)."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'import.db'}")
+    Base.metadata.create_all(bind=engine)
+    create_spatial_index(engine)
+    create_search_index(engine)
+    create_blob_refcounts(engine)
+    with Session(engine) as db:
+        db.add_all(Status(name=name) for name in ("open", "pending", "resolved"))
+        db.commit()
+    yield engine
+    engine.dispose()
+
+
+def _problems(bind):
+    with bind.connect() as conn:
+        return conn.execute(
+            select(Problem.title, Location.address, Location.latitude, Location.longitude, Status.name)
+            .join(Location, Problem.location_id == Location.id)
+            .join(Status, Problem.status_id == Status.id)
+            .order_by(Problem.id)
+        ).all()
+
+
+CSV = """title,description,latitude,longitude,address,status,created_at
+Rupa 1,Rupa na cesti,43.51,16.44,Adresa 1,open,2023-05-01T08:00:00
+Rupa 2,Rupa na cesti,43.52,16.45,Adresa 2,pending,
+X,Prekratak naslov,43.5,16.4,Adresa 3,open,
+Rupa 4,Rupa na cesti,43.54,16.47,Adresa 4,zatvoreno,
+Rupa 5,Rupa na cesti,95,16.48,Adresa 5,open,
+Rupa 6,Rupa na cesti,43.56,16.49,Adresa 6,resolved,
+Rupa 7,Rupa na cesti,,,Adresa 7,open,
+"""
+
+
+def test_csv_import_pairs_locations_and_reports_bad_rows(bind):
+    report = import_problems(io.StringIO(CSV), "csv", bind=bind, batch_size=2)
+
+    assert (report["inserted"], report["failed"], report["errors_truncated"]) == (4, 3, False)
+    errors = {e["row"]: e["error"] for e in report["errors"]}
+    assert sorted(errors) == [3, 4, 5]
+    assert errors[3].startswith("title:")
+    assert errors[4] == "status: nepoznat status 'zatvoreno'"
+    assert errors[5].startswith("latitude:")
+
+    # svaki problem ima lokaciju iz svog retka, i preko granica batcheva
+    assert _problems(bind) == [
+        ("Rupa 1", "Adresa 1", 43.51, 16.44, "open"),
+        ("Rupa 2", "Adresa 2", 43.52, 16.45, "pending"),
+        ("Rupa 6", "Adresa 6", 43.56, 16.49, "resolved"),
+        ("Rupa 7", "Adresa 7", None, None, "open"),
+    ]
+
+    with bind.connect() as conn:
+        clusters = conn.execute(
+            select(MapCluster.zoom, func.sum(MapCluster.count)).group_by(MapCluster.zoom)
+        ).all()
+        x, y = tile_for(43.51, 16.44, 16)
+        tile = conn.execute(select(MapCluster.count, MapCluster.lat_sum).where(
+            MapCluster.zoom == 16, MapCluster.tile_x == x, MapCluster.tile_y == y
+        )).one()
+    # Rupa 7 nema koordinate pa nije na karti
+    assert {count for _, count in clusters} == {3}
+    assert tile == (1, 43.51)
+
+
+def test_max_errors_truncates_report(bind):
+    rows = "title,description\n" + "X,kratko\n" * 5
+    report = import_problems(io.StringIO(rows), "csv", bind=bind, max_errors=2)
+    assert (report["failed"], len(report["errors"]), report["errors_truncated"]) == (5, 2, True)
+
+
+def test_ndjson_and_geojson(bind):
+    feature = {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [16.44, 43.51]},
+        "properties": {"title": "Rupa geo", "description": "Rupa na cesti", "address": "Adresa G"},
+    }
+    ndjson = "\n".join([
+        json.dumps({"title": "Rupa nd", "description": "Rupa na cesti", "address": "Adresa N", "status": "pending"}),
+        "{neispravan",
+        "[1, 2]",
+        "",
+        json.dumps(feature),
+    ])
+    report = import_problems(io.StringIO(ndjson), "ndjson", bind=bind)
+    assert (report["inserted"], [e["row"] for e in report["errors"]]) == (2, [2, 3])
+
+    collection = {"type": "FeatureCollection", "features": [feature, {**feature, "properties": {"title": "X"}}]}
+    report = import_problems(io.StringIO(json.dumps(collection)), "geojson", bind=bind)
+    assert (report["inserted"], report["failed"]) == (1, 1)
+
+    assert _problems(bind) == [
+        ("Rupa nd", "Adresa N", None, None, "pending"),
+        ("Rupa geo", "Adresa G", 43.51, 16.44, "open"),
+        ("Rupa geo", "Adresa G", 43.51, 16.44, "open"),
+    ]
+
+
+def test_import_endpoint(client, make_user):
+    _, admin = make_user("admin", admin=True)
+    _, user = make_user()
+    title = f"Uvoz {uuid.uuid4().hex[:8]}"
+    body = f"title,description,latitude,longitude\n{title},Rupa na cesti,43.5,16.4\nX,kratko,,\n"
+    files = {"file": ("prijave.csv", body.encode(), "text/csv")}
+
+    assert client.post("/admin/problems/import", files=files, headers=user).status_code == 403
+
+    r = client.post("/admin/problems/import", files=files, headers=admin)
+    assert r.status_code == 200, r.text
+    report = r.json()
+    assert (report["inserted"], report["failed"], report["errors_truncated"]) == (1, 1, False)
+    assert [e["row"] for e in report["errors"]] == [2]
+    assert report["errors"][0]["error"].startswith("title:")
+    assert client.get("/problems", params={"search": title.split()[1]}).json()["items"][0]["title"] == title
+
+    files = {"file": ("prijave.txt", body.encode(), "text/plain")}
+    assert client.post("/admin/problems/import", files=files, headers=admin).status_code == 400
+
+
+def test_body_limit_is_per_path():
+    async def echo(request):
+        return PlainTextResponse(str(len(await request.body())))
+
+    app = Starlette(routes=[Route("/import", echo, methods=["POST"]), Route("/other", echo, methods=["POST"])])
+    limited = TestClient(BodySizeLimitMiddleware(app, max_bytes=100, limits={"/import": 1000}))
+
+    assert limited.post("/import", content=b"x" * 500).text == "500"
+    assert limited.post("/other", content=b"x" * 500).status_code == 413
+    assert limited.post("/import", content=b"x" * 1500).status_code == 413
@@ -0,0 +1,21 @@
+import uuid
+
+import orjson
+from sqlalchemy import text
+
+
+def test_export_date_range_across_stored_formats(client, db, make_user, make_problems):
+    _, headers = make_user()
+    word = f"ex{uuid.uuid4().hex[:8]}"
+    ids = make_problems(4, title=word)
+    # created_at kako ga spremaju server_default, bulk import i stari klijenti
+    stored = ["2024-03-01T10:00:00", "2024-03-01 12:00:00", "2024-03-01T14:00:00+02:00", "2024-03-01T13:00:00"]
+    for problem_id, created_at in zip(ids, stored):
+        db.execute(text("UPDATE problems SET created_at = :c WHERE id = :id"), {"c": created_at, "id": problem_id})
+    db.commit()
+
+    r = client.get("/export/problems", headers=headers, params={
+        "search": word, "since": "2024-03-01T11:00:00Z", "until": "2024-03-01T15:00:00+02:00",
+    })
+    assert r.status_code == 200
+    assert [orjson.loads(line)["id"] for line in r.content.splitlines()] == ids[1:3]
@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, delete, insert, select
+
+import notify
+import retention
+from counters import create_notification_counter
+from database import Base, count_queries, engine
+from models import Notification, User
+
+
+def _add_notes(user_id, created_at, n, is_read=False, bind=engine):
+    """n notifikacija s istim created_at (redoslijed tada određuje id)."""
+    with bind.begin() as conn:
+        return [
+            conn.execute(
+                insert(Notification)
+                .values(user_id=user_id, message=f"Poruka {i}", kind="status", is_read=is_read,
+                        created_at=created_at, version=notify.next_version())
+                .returning(Notification.id)
+            ).scalar_one()
+            for i in range(n)
+        ]
+
+
+def _unread(client, headers):
+    return client.get("/notifications/unread-count", headers=headers).json()["unread"]
+
+
+def test_keyset_pages_cover_all_rows_newest_first(client, make_user):
+    user_id, headers = make_user()
+    now = datetime.utcnow()
+    older = _add_notes(user_id, now - timedelta(hours=1), 3)
+    newer = _add_notes(user_id, now, 4)   # isti created_at, poredak po id
+    _add_notes(make_user()[0], now, 2)    # tuđe
+
+    ids, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/notifications/", params=params, headers=headers).json()
+        assert len(body["items"]) <= 3
+        ids += [item["id"] for item in body["items"]]
+        if (cursor := body["next_cursor"]) is None:
+            break
+
+    assert ids == newer[::-1] + older[::-1]
+
+    r = client.get("/notifications/", params={"cursor": "nije-cursor"}, headers=headers)
+    assert r.status_code == 400
+
+
+def test_unread_only(client, make_user):
+    user_id, headers = make_user()
+    now = datetime.utcnow()
+    (unread,) = _add_notes(user_id, now, 1)
+    _add_notes(user_id, now, 2, is_read=True)
+
+    body = client.get("/notifications/", params={"unread_only": True}, headers=headers).json()
+    assert [item["id"] for item in body["items"]] == [unread]
+
+
+def test_unread_counter_follows_insert_mark_read_and_delete(client, make_user):
+    user_id, headers = make_user()
+    other_id, other = make_user()
+    a, b, c, d, e = _add_notes(user_id, datetime.utcnow(), 5)
+    (foreign,) = _add_notes(other_id, datetime.utcnow(), 1)
+    assert _unread(client, headers) == 5
+
+    r = client.post("/notifications/mark-read", params={"ids": [a, b, foreign]}, headers=headers)
+    assert r.json() == {"updated": 2}   # tuđa se ne dira
+    assert (_unread(client, headers), _unread(client, other)) == (3, 1)
+
+    # ponovno označavanje istih ne smanjuje brojač još jednom
+    assert client.post("/notifications/mark-read", params={"ids": [a]}, headers=headers).json() == {"updated": 0}
+    assert client.patch(f"/notifications/{c}/read", headers=headers).status_code == 200
+    assert _unread(client, headers) == 2
+
+    with engine.begin() as conn:
+        conn.execute(delete(Notification).where(Notification.id.in_([a, d])))   # pročitana i nepročitana
+    assert _unread(client, headers) == 1
+
+    assert client.post("/notifications/mark-all-read", headers=headers).json() == {"updated": 1}
+    assert _unread(client, headers) == 0
+    assert _unread(client, other) == 1
+
+
+@pytest.fixture
+def prune_engine(tmp_path):
+    bind = create_engine(f"sqlite:///{tmp_path / 'prune.db'}")
+    Base.metadata.create_all(bind=bind)
+    create_notification_counter(bind)
+    with bind.begin() as conn:
+        conn.execute(insert(User).values(id=1, username="u"))
+    yield bind
+    bind.dispose()
+
+
+def test_prune_deletes_old_read_rows_in_batches(prune_engine):
+    old = datetime.utcnow() - timedelta(days=retention.NOTIFICATION_RETENTION_DAYS + 1)
+    old_read = _add_notes(1, old, 5, is_read=True, bind=prune_engine)
+    old_unread = _add_notes(1, old, 2, bind=prune_engine)
+    recent_read = _add_notes(1, datetime.utcnow(), 2, is_read=True, bind=prune_engine)
+    newest = _add_notes(1, old, 1, is_read=True, bind=prune_engine)   # najveća verzija
+
+    with count_queries(prune_engine) as counter:
+        removed = retention.prune_notifications(prune_engine, batch=2)
+
+    assert removed == 5
+    deletes = [s for s in counter["statements"] if s.lstrip().startswith("DELETE")]
+    assert len(deletes) == 3   # 2 + 2 + 1
+    with prune_engine.connect() as conn:
+        left = conn.scalars(select(Notification.id).order_by(Notification.id)).all()
+        unread = conn.scalar(select(User.unread_notifications).where(User.id == 1))
+    assert left == old_unread + recent_read + newest
+    assert set(old_read).isdisjoint(left)
+    assert unread == 2
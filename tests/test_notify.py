@@ -0,0 +1,248 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+import notify
+from database import engine, read_engine
+from models import Notification
+
+
+class StandInBroker(notify.MemoryBroker):
+    """Lokalni zamjenski broker: bilježi sve objave i prosljeđuje ih dalje."""
+
+    def __init__(self):
+        super().__init__()
+        self.published = []
+
+    def publish(self, user_id, payload):
+        self.published.append((user_id, payload))
+        super().publish(user_id, payload)
+
+
+@pytest.fixture
+def broker():
+    previous = notify.broker
+    stand_in = StandInBroker()
+    notify.set_broker(stand_in)
+    yield stand_in
+    notify.set_broker(previous)
+
+
+def _payload(n):
+    return {"id": n, "version": n, "message": f"poruka {n}", "is_read": False, "created_at": None, "count": 1}
+
+
+def test_write_paths_publish_through_swapped_broker(client, broker, make_user, make_problems):
+    owner_id, _ = make_user("owner")
+    _, voter = make_user("voter")
+    (problem_id,) = make_problems(1, user_id=owner_id)
+
+    assert client.post(f"/problems/{problem_id}/vote", headers=voter).status_code == 200
+
+    assert [user_id for user_id, _ in broker.published] == [owner_id]
+    assert broker.published[0][1]["message"].startswith("Netko je glasao")
+
+
+def _comment_main1(client, problem_id, text, headers):
+    return client.post(f"/problems/{problem_id}/comments", json={"text": text}, headers=headers)
+
+
+def _comment_router(client, problem_id, text, headers):
+    return client.post("/comments/", params={"problem_id": problem_id, "text": text}, headers=headers)
+
+
+@pytest.mark.parametrize("comment", [_comment_main1, _comment_router])
+def test_own_comment_does_not_notify_owner(client, broker, make_user, make_problems, comment):
+    owner_id, owner = make_user("owner")
+    _, other = make_user("other")
+    (problem_id,) = make_problems(1, user_id=owner_id)
+
+    assert comment(client, problem_id, "moj", owner).status_code == 200
+    assert broker.published == []
+
+    assert comment(client, problem_id, "tuđi", other).status_code == 200
+    assert [user_id for user_id, _ in broker.published] == [owner_id]
+
+
+def test_publish_from_worker_thread_reaches_subscriber(broker):
+    async def scenario():
+        async with broker.subscribe(7) as sub:
+            worker = threading.Thread(target=broker.publish, args=(7, _payload(1)))
+            worker.start()
+            worker.join()
+            broker.publish(8, _payload(2))   # drugi korisnik
+            return await asyncio.wait_for(sub.get(), 1)
+
+    assert asyncio.run(scenario())["id"] == 1
+
+
+def test_full_queue_drops_oldest(broker):
+    size = notify.SUBSCRIBER_QUEUE_SIZE
+
+    async def scenario():
+        async with broker.subscribe(7) as sub:
+            for n in range(size + 5):
+                broker.publish(7, _payload(n))
+            await asyncio.sleep(0)   # isporuka ide kroz call_soon_threadsafe
+            received = [(await sub.get())["id"] for _ in range(size)]
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(sub.get(), 0.05)
+            return received
+
+    assert asyncio.run(scenario()) == list(range(5, size + 5))
+
+
+def test_close_ends_subscription(broker):
+    async def scenario():
+        async with broker.subscribe(7) as sub:
+            broker.close()
+            result = await asyncio.wait_for(sub.get(), 1)
+        return result, broker._subscribers
+
+    assert asyncio.run(scenario()) == (None, {})
+
+
+def test_close_ends_sse_stream(client, broker, make_user):
+    _, headers = make_user()
+
+    def close_when_subscribed():
+        while not broker._subscribers:
+            time.sleep(0.01)
+        broker.close()
+
+    threading.Thread(target=close_when_subscribed, daemon=True).start()
+
+    # TestClient vraća odgovor tek kad stream završi
+    with client.stream("GET", "/notifications/stream", headers=headers) as r:
+        body = b"".join(r.iter_bytes())
+
+    assert r.status_code == 200
+    assert body.startswith(b"retry: 5000")
+    assert broker._subscribers == {}
+
+
+# ---------------------------
+# SPAJANJE I DNEVNI SAŽETAK
+# ---------------------------
+def _notes(user_id):
+    with read_engine.connect() as conn:
+        return conn.execute(
+            select(Notification.id, Notification.kind, Notification.count, Notification.message,
+                   Notification.is_read, Notification.version)
+            .where(Notification.user_id == user_id)
+            .order_by(Notification.id)
+        ).all()
+
+
+def _backdate(user_id, **delta):
+    with engine.begin() as conn:
+        conn.execute(
+            update(Notification).where(Notification.user_id == user_id)
+            .values(created_at=datetime.utcnow() - timedelta(**delta))
+        )
+
+
+@pytest.fixture
+def owner_problem(make_user, make_problems):
+    owner_id, owner = make_user("owner")
+    (problem_id,) = make_problems(1, user_id=owner_id, title="Rupa")
+    return owner_id, owner, problem_id
+
+
+def _vote(client, make_user, problem_id):
+    _, voter = make_user("voter")
+    assert client.post(f"/problems/{problem_id}/vote", headers=voter).status_code == 200
+
+
+@pytest.mark.parametrize("count, message", [
+    (1, "Netko je glasao za tvoj problem: Rupa 0"),
+    (2, "2 nova glasa za tvoj problem: Rupa 0"),
+    (5, "5 novih glasova za tvoj problem: Rupa 0"),
+    (12, "12 novih glasova za tvoj problem: Rupa 0"),
+    (21, "21 novi glas za tvoj problem: Rupa 0"),
+    (23, "23 nova glasa za tvoj problem: Rupa 0"),
+])
+def test_vote_messages(count, message):
+    assert notify._message("vote", count, "Rupa 0") == message
+
+
+def test_comment_messages():
+    assert notify._message("comment", 1, "X") == "Novi komentar na tvoj problem: X"
+    assert notify._message("comment", 3, "X") == "3 nova komentara na tvoj problem: X"
+    assert notify._message("comment", 11, "X") == "11 novih komentara na tvoj problem: X"
+
+
+def test_votes_merge_into_one_row_with_new_versions(client, broker, make_user, owner_problem):
+    owner_id, owner, problem_id = owner_problem
+    for _ in range(3):
+        _vote(client, make_user, problem_id)
+
+    (note,) = _notes(owner_id)
+    assert (note.kind, note.count, note.message) == ("vote", 3, "3 nova glasa za tvoj problem: Rupa 0")
+
+    payloads = [p for user_id, p in broker.published if user_id == owner_id]
+    assert [p["id"] for p in payloads] == [note.id] * 3
+    assert [p["count"] for p in payloads] == [1, 2, 3]
+    versions = [p["version"] for p in payloads]
+    assert versions == sorted(set(versions)) and versions[-1] == note.version
+
+    assert client.get("/notifications/unread-count", headers=owner).json() == {"unread": 1}
+
+
+def test_read_notification_is_not_merged(client, make_user, owner_problem):
+    owner_id, owner, problem_id = owner_problem
+    _vote(client, make_user, problem_id)
+    assert client.post("/notifications/mark-all-read", headers=owner).json() == {"updated": 1}
+    _vote(client, make_user, problem_id)
+
+    assert [(n.count, bool(n.is_read)) for n in _notes(owner_id)] == [(1, True), (1, False)]
+
+
+def test_merging_stops_after_window(client, make_user, owner_problem):
+    owner_id, _, problem_id = owner_problem
+    _vote(client, make_user, problem_id)
+    _backdate(owner_id, seconds=notify.COALESCE_WINDOW_SECONDS + 60)
+    _vote(client, make_user, problem_id)
+
+    assert [n.count for n in _notes(owner_id)] == [1, 1]
+
+
+def test_digest_replaces_pending_rows_with_one_summary(client, broker, make_user, owner_problem):
+    owner_id, owner, problem_id = owner_problem
+    assert client.put("/notifications/settings", json={"digest": True}, headers=owner).status_code == 200
+
+    # digest korisnici skupljaju cijeli dan, bez pusha
+    _vote(client, make_user, problem_id)
+    _vote(client, make_user, problem_id)
+    _, commenter = make_user("commenter")
+    client.post(f"/problems/{problem_id}/comments", json={"text": "isto"}, headers=commenter)
+    assert sorted((n.kind, n.count) for n in _notes(owner_id)) == [("comment", 1), ("vote", 2)]
+    assert broker.published == []
+
+    last_version = max(n.version for n in _notes(owner_id))
+    _backdate(owner_id, days=1)
+    assert notify.send_digests(engine) >= 1
+
+    (digest,) = _notes(owner_id)
+    assert (digest.kind, digest.count) == ("digest", 3)
+    assert digest.message.startswith("Dnevni sažetak: ")
+    assert "2 nova glasa" in digest.message and "1 novi komentar" in digest.message
+    assert digest.message.endswith("na 1 problemu")
+    assert digest.version > last_version
+    ((user_id, payload),) = broker.published
+    assert user_id == owner_id
+    assert (payload["id"], payload["version"], payload["count"]) == (digest.id, digest.version, 3)
+    assert client.get("/notifications/unread-count", headers=owner).json() == {"unread": 1}
+
+
+def test_incomplete_broker_fails_on_creation():
+    class PublishOnly(notify.NotificationBroker):
+        def publish(self, user_id, payload):
+            pass
+
+    with pytest.raises(TypeError, match="abstract"):
+        PublishOnly()
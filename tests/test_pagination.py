@@ -0,0 +1,33 @@
+import asyncio
+
+from sqlalchemy import select
+
+import pagination
+from ttl_cache import TTLCache
+from models import Problem
+
+
+class CountingDB:
+    def __init__(self):
+        self.calls = 0
+
+    async def scalar(self, stmt):
+        self.calls += 1
+        return 7
+
+
+def test_cached_count_is_bounded_and_expires(monkeypatch):
+    monkeypatch.setattr(pagination, "_count_cache", TTLCache(2))
+    db = CountingDB()
+    count = lambda key: asyncio.run(pagination.cached_count(key, db, select(Problem.id)))
+
+    assert [count(k) for k in ("a", "a", "b", "c")] == [7] * 4
+    assert db.calls == 3
+    assert len(pagination._count_cache._data) == 2
+
+    count("a")   # najstariji ključ je izbačen
+    assert db.calls == 4
+
+    monkeypatch.setattr(pagination, "COUNT_CACHE_TTL", -1)
+    count("d"), count("d")
+    assert db.calls == 6
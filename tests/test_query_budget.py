@@ -0,0 +1,73 @@
+from models import Comment, ProblemStatusHistory, SavedProblem, Status
+
+
+def test_saved_list_50_items(client, db, make_user, make_problems, query_budget):
+    user_id, headers = make_user()
+    db.add_all(SavedProblem(user_id=user_id, problem_id=pid) for pid in make_problems(50))
+    db.commit()
+
+    with query_budget(3):
+        r = client.get("/saved/", headers=headers)
+    assert r.status_code == 200
+    assert len(r.json()) == 50
+
+
+def test_bookmarks_list(client, db, make_user, make_problems, query_budget):
+    user_id, headers = make_user()
+    db.add_all(SavedProblem(user_id=user_id, problem_id=pid) for pid in make_problems(20))
+    db.commit()
+
+    with query_budget(3):
+        r = client.get("/bookmarks/", headers=headers)
+    assert r.status_code == 200
+    assert len(r.json()) == 20
+
+
+def test_status_history(client, db, make_user, make_problems, query_budget):
+    admin_id, headers = make_user("admin", admin=True)
+    (problem_id,) = make_problems(1)
+    statuses = [s.id for s in db.query(Status).order_by(Status.id)]
+    db.add_all(
+        ProblemStatusHistory(
+            problem_id=problem_id, changed_by=admin_id,
+            old_status_id=statuses[i % 2], new_status_id=statuses[(i + 1) % 2],
+        )
+        for i in range(20)
+    )
+    db.commit()
+
+    with query_budget(3):
+        r = client.get(f"/admin/problems/problems/{problem_id}/status-history", headers=headers)
+    assert r.status_code == 200
+    assert len(r.json()) == 20
+
+
+def _comments(db, make_user, problem_id, n):
+    authors = [make_user("commenter")[0] for _ in range(3)]
+    db.add_all(Comment(text=f"komentar {i}", user_id=authors[i % 3], problem_id=problem_id) for i in range(n))
+    db.commit()
+
+
+def test_comment_lists(client, db, make_user, make_problems, query_budget):
+    (problem_id,) = make_problems(1)
+    _comments(db, make_user, problem_id, 30)
+
+    for path in (f"/comments/{problem_id}", f"/problems/{problem_id}/comments"):
+        with query_budget(2):
+            r = client.get(path)
+        assert r.status_code == 200
+        assert len(r.json()) == 30
+        assert {"id", "text", "created_at", "username"} <= r.json()[0].keys()
+
+
+def test_problem_list(client, make_problems, query_budget):
+    make_problems(60, title="Budget")
+
+    with query_budget(3):
+        r = client.get("/problems", params={"limit": 50})
+    assert r.status_code == 200
+    assert len(r.json()["items"]) == 50
+
+    with query_budget(3):
+        r = client.get("/problems", params={"limit": 50, "search": "budget", "cursor": r.json()["next_cursor"]})
+    assert r.status_code == 200
@@ -0,0 +1,16 @@
+import pytest
+
+import response_cache
+
+
+def test_incomplete_backend_fails_on_creation():
+    class GetOnly(response_cache.CacheBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError, match="abstract"):
+        GetOnly()
+
+
+def test_memory_backend_implements_interface():
+    assert isinstance(response_cache.MemoryBackend(), response_cache.CacheBackend)
@@ -0,0 +1,34 @@
+from sqlalchemy import create_engine, event, text
+
+import models  # noqa: F401  (puni Base.metadata)
+from database import Base, upgrade_schema
+
+
+def test_upgrade_adds_foreign_keys_to_new_columns(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    event.listen(engine, "connect", lambda conn, _: conn.execute("PRAGMA foreign_keys=ON"))
+    Base.metadata.create_all(engine, tables=[
+        t for t in Base.metadata.sorted_tables if t.name != "notifications"
+    ])
+    with engine.begin() as conn:
+        # notifications iz vremena prije spajanja notifikacija
+        conn.execute(text(
+            "CREATE TABLE notifications (id INTEGER PRIMARY KEY, "
+            "user_id INTEGER NOT NULL REFERENCES users (id), message VARCHAR NOT NULL, "
+            "is_read BOOLEAN, created_at DATETIME)"
+        ))
+
+    upgrade_schema(engine)
+
+    with engine.begin() as conn:
+        fks = {
+            row[3]: (row[2], row[6])   # from -> (table, on_delete)
+            for row in conn.execute(text("PRAGMA foreign_key_list(notifications)"))
+        }
+        assert fks["problem_id"] == ("problems", "SET NULL")
+
+        conn.execute(text("INSERT INTO users (id, username) VALUES (1, 'u')"))
+        conn.execute(text("INSERT INTO problems (id, title) VALUES (1, 'p')"))
+        conn.execute(text("INSERT INTO notifications (user_id, message, problem_id) VALUES (1, 'm', 1)"))
+        conn.execute(text("DELETE FROM problems WHERE id = 1"))
+        assert conn.scalar(text("SELECT problem_id FROM notifications")) is None
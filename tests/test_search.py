@@ -0,0 +1,54 @@
+import uuid
+
+
+def _add(db, rows):
+    from models import Location, Problem, Status
+
+    status = db.query(Status).filter_by(name="open").one()
+    problems = []
+    for title, description in rows:
+        location = Location(latitude=43.5, longitude=16.4, address="Riva")
+        db.add(location)
+        db.flush()
+        problems.append(Problem(
+            title=title, description=description, image_path="",
+            status_id=status.id, location_id=location.id,
+        ))
+    db.add_all(problems)
+    db.flush()
+    ids = [p.id for p in problems]
+    db.commit()
+    return ids
+
+
+def _pages(client, **params):
+    items, cursor = [], None
+    while True:
+        body = client.get("/problems", params={**params, **({"cursor": cursor} if cursor else {})}).json()
+        items += [p["id"] for p in body["items"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return items
+
+
+def test_search_sorts_by_relevance_across_pages(client, db):
+    word = f"sk{uuid.uuid4().hex[:8]}"
+    in_description = _add(db, [(f"Problem {i}", f"Opis {word}") for i in range(3)])
+    in_title = _add(db, [(f"{word} {i}", "Opis") for i in range(3)])
+
+    ids = _pages(client, search=word, limit=2)
+    # naslov ima veću težinu (fulltext.TITLE_WEIGHT), pa ti problemi idu prvi
+    assert sorted(ids[:3]) == in_title
+    assert sorted(ids[3:]) == in_description
+    assert ids == _pages(client, search=word, sort="relevance", limit=4)
+
+
+def test_search_can_sort_by_date(client, db):
+    word = f"sk{uuid.uuid4().hex[:8]}"
+    ids = _add(db, [(f"{word} {i}", "Opis") for i in range(2)] + [("Problem", f"Opis {word}")])
+
+    assert _pages(client, search=word, sort="new", limit=2) == ids[::-1]
+
+
+def test_invalid_cursor(client):
+    assert client.get("/problems", params={"search": "rupa", "cursor": "xx"}).status_code == 400
@@ -0,0 +1,198 @@
+import asyncio
+import io
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, select, update, delete
+from starlette.datastructures import UploadFile
+
+import storage
+from database import Base
+from models import ImageBlob, Problem
+from storage import LocalBackend, collect_garbage, create_blob_refcounts, register_blob, save_upload
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 200
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Lokalni backend u privremenom direktoriju, postavljen i kao storage.backend."""
+    previous = storage.backend
+    local = LocalBackend(str(tmp_path / "uploads"))
+    storage.set_backend(local)
+    yield local
+    storage.set_backend(previous)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'blobs.db'}")
+    Base.metadata.create_all(bind=engine)
+    create_blob_refcounts(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def save(store, engine):
+    def save(data, name="slika.png"):
+        return asyncio.run(save_upload(UploadFile(file=io.BytesIO(data), filename=name), store, engine))
+
+    return save
+
+
+def _refcount(engine, key):
+    with engine.connect() as conn:
+        return conn.scalar(select(ImageBlob.refcount).where(ImageBlob.key == key))
+
+
+def _age(store, engine, key, seconds):
+    """Kao da je zadnji put() i pin bio prije `seconds` sekundi."""
+    old = time.time() - seconds
+    os.utime(os.path.join(store.root, key), (old, old))
+    with engine.begin() as conn:
+        conn.execute(
+            update(ImageBlob).where(ImageBlob.key == key)
+            .values(pinned_at=datetime.utcnow() - timedelta(seconds=seconds))
+        )
+
+
+def test_identical_uploads_share_one_sharded_file(store, save):
+    first = save(PNG, "a.png")
+    second = save(PNG, "b.png")
+    other = save(PNG + b"\x01", "c.png")
+
+    assert first.key == second.key != other.key
+    assert first.key == f"{first.sha256[:2]}/{first.sha256[2:4]}/{first.sha256}.png"
+    assert (first.created, second.created) == (True, False)
+    assert sorted(store.keys()) == sorted([first.key, other.key])
+    assert os.path.isfile(first.path)
+    assert os.listdir(store.staging_dir) == []
+
+
+def test_refcount_follows_problem_insert_update_delete(save, engine):
+    a, b = save(PNG), save(PNG + b"\x01")
+    with engine.begin() as conn:
+        conn.execute(register_blob(a))
+        conn.execute(register_blob(b))
+        conn.execute(register_blob(a))   # ponovni upload iste slike
+        conn.execute(Problem.__table__.insert(), [
+            {"title": "Prvi", "image_path": a.path, "image_url": None},
+            {"title": "Drugi", "image_path": a.path, "image_url": None},
+            {"title": "Treći", "image_path": None, "image_url": b.key},   # veza preko ključa
+        ])
+    assert (_refcount(engine, a.key), _refcount(engine, b.key)) == (2, 1)
+
+    with engine.begin() as conn:
+        conn.execute(update(Problem).where(Problem.title == "Drugi").values(image_path=b.path))
+    assert (_refcount(engine, a.key), _refcount(engine, b.key)) == (1, 2)
+
+    with engine.begin() as conn:
+        conn.execute(delete(Problem).where(Problem.title.in_(["Prvi", "Treći"])))
+    assert (_refcount(engine, a.key), _refcount(engine, b.key)) == (0, 1)
+
+
+def test_collect_garbage_honours_grace(store, engine, save):
+    orphan, used = save(PNG), save(PNG + b"\x01")
+    with engine.begin() as conn:
+        conn.execute(Problem.__table__.insert(), {"title": "Koristi", "image_path": used.path})
+    # datoteka u storeu bez retka u image_blobs (stari upload)
+    stray = storage.blob_key("ab" * 32, "png")
+    staged = os.path.join(store.staging_dir, "stray.part")
+    with open(staged, "wb") as f:
+        f.write(PNG)
+    store.put(staged, stray)
+
+    assert collect_garbage(engine, store, grace=60) == 0
+    assert set(store.keys()) == {orphan.key, used.key, stray}
+
+    for key in (orphan.key, used.key, stray):
+        _age(store, engine, key, 120)
+    assert collect_garbage(engine, store, grace=60) == 2
+    assert list(store.keys()) == [used.key]
+    assert _refcount(engine, orphan.key) is None
+    assert _refcount(engine, used.key) == 1
+
+
+def test_dedup_upload_refreshes_grace(store, engine, save):
+    upload = save(PNG)
+    _age(store, engine, upload.key, 120)
+
+    # ista slika stiže ponovno dok njen problem još nije commitan
+    assert save(PNG).created is False
+    assert collect_garbage(engine, store, grace=60) == 0
+    assert store.exists(upload.key)
+
+
+class InterleavingBackend(LocalBackend):
+    """Pokreće `hook` jednom, unutar zadane metode, prije nego što ona nastavi."""
+
+    def __init__(self, root, method, hook):
+        super().__init__(root)
+        self._method, self._hook = method, hook
+
+    def _maybe_hook(self, method):
+        if self._method == method and self._hook:
+            hook, self._hook = self._hook, None
+            hook()
+
+    def age(self, key):
+        age = super().age(key)
+        self._maybe_hook("age")
+        return age
+
+    def put(self, local_path, key):
+        self._maybe_hook("put")
+        return super().put(local_path, key)
+
+
+def _commit_problem(engine, upload):
+    with engine.begin() as conn:
+        conn.execute(register_blob(upload))
+        conn.execute(Problem.__table__.insert(), {"title": "Novi", "image_path": upload.path})
+
+
+def test_upload_between_gc_age_check_and_delete(tmp_path, engine):
+    uploads = []
+    upload_file = lambda: UploadFile(file=io.BytesIO(PNG), filename="a.png")
+    # GC je već zaključio da je slika stara kad ista slika stigne ponovno
+    store = InterleavingBackend(
+        str(tmp_path / "uploads"), "age",
+        lambda: uploads.append(asyncio.run(save_upload(upload_file(), store, engine))),
+    )
+    first = asyncio.run(save_upload(upload_file(), store, engine))
+    _age(store, engine, first.key, 120)
+
+    assert collect_garbage(engine, store, grace=60) == 0
+    (upload,) = uploads
+    _commit_problem(engine, upload)
+    assert store.exists(upload.key)
+    assert _refcount(engine, upload.key) == 1
+
+
+def test_gc_between_upload_pin_and_put(tmp_path, engine):
+    removed = []
+    upload_file = lambda: UploadFile(file=io.BytesIO(PNG), filename="a.png")
+    store = InterleavingBackend(str(tmp_path / "uploads"), "put", None)
+    first = asyncio.run(save_upload(upload_file(), store, engine))
+    _age(store, engine, first.key, 120)
+
+    # GC prođe cijeli krug nakon što je novi upload pinao redak, a prije put()
+    store._hook = lambda: removed.append(collect_garbage(engine, store, grace=60))
+    upload = asyncio.run(save_upload(upload_file(), store, engine))
+
+    assert removed == [0]
+    _commit_problem(engine, upload)
+    assert store.exists(upload.key)
+    assert _refcount(engine, upload.key) == 1
+
+
+def test_incomplete_backend_fails_on_creation():
+    class PutOnly(storage.StorageBackend):
+        def put(self, local_path, key):
+            return True
+
+    with pytest.raises(TypeError, match="abstract"):
+        PutOnly()
@@ -0,0 +1,76 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from write_queue import WriteQueue
+
+
+class FlakySession:
+    """Sesija čiji commit i rollback padaju dok je `broken` postavljen."""
+
+    def __init__(self, state):
+        self.state = state
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @asynccontextmanager
+    async def _nested(self):
+        yield
+
+    def begin_nested(self):
+        return self._nested()
+
+    async def commit(self):
+        if self.state["broken"]:
+            raise RuntimeError("disk I/O error")
+        self.state["commits"] += 1
+
+    async def rollback(self):
+        if self.state["broken"]:
+            raise RuntimeError("cannot rollback - no transaction is active")
+
+
+def test_failed_rollback_fails_the_batch_and_keeps_the_writer(caplog):
+    state = {"broken": True, "commits": 0}
+    queue = WriteQueue(lambda: FlakySession(state), window_ms=20)
+
+    async def op(db):
+        return "ok"
+
+    async def scenario():
+        queue.start()
+        results = await asyncio.wait_for(
+            asyncio.gather(queue.submit(op), queue.submit(op), return_exceptions=True), 1
+        )
+        assert [type(r) for r in results] == [RuntimeError, RuntimeError]
+        assert "cannot rollback" in str(results[0])
+        assert queue.running
+
+        state["broken"] = False
+        assert await asyncio.wait_for(queue.submit(op), 1) == "ok"
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert state["commits"] == 1
+    assert "Write batch failed" in caplog.text
+
+
+def test_stop_commits_pending_ops():
+    state = {"broken": False, "commits": 0}
+    queue = WriteQueue(lambda: FlakySession(state), window_ms=1000)
+
+    async def op(db):
+        return 1
+
+    async def scenario():
+        queue.start()
+        pending = [asyncio.ensure_future(queue.submit(op)) for _ in range(3)]
+        await asyncio.sleep(0)
+        await queue.stop()
+        return await asyncio.gather(*pending)
+
+    assert asyncio.run(scenario()) == [1, 1, 1]
+    assert state["commits"] == 1
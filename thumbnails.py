@@ -0,0 +1,133 @@
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+# ---------------------------
+# THUMBNAILI
+# ---------------------------
+# Smanjene verzije slika rade se na zahtjev u zasebnom process poolu
+# (Pillow drži GIL dok dekodira) i spremaju na disk. Širina se zaokružuje
+# na THUMB_WIDTHS da cache ne raste sa svakom ?w= vrijednošću, a kad
+# cache prijeđe THUMB_CACHE_MAX_BYTES brišu se najdulje nekorištene.
+THUMB_WIDTHS = (160, 320, 640, 1280)
+THUMB_FORMATS = {"webp": "image/webp", "jpeg": "image/jpeg"}
+THUMB_QUALITY = int(os.getenv("THUMB_QUALITY", "80"))
+THUMB_WORKERS = int(os.getenv("THUMB_WORKERS", "2"))
+THUMB_CACHE_DIR = os.getenv("THUMB_CACHE_DIR", "thumb_cache")
+THUMB_CACHE_MAX_BYTES = int(os.getenv("THUMB_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+def snap_width(width: int) -> int:
+    """Najmanja širina iz THUMB_WIDTHS koja nije manja od tražene."""
+    for candidate in THUMB_WIDTHS:
+        if candidate >= width:
+            return candidate
+    return THUMB_WIDTHS[-1]
+
+
+def render_thumbnail(src: str, dst: str, width: int, fmt: str) -> int:
+    """Izvršava se u worker procesu. Vraća veličinu zapisane datoteke."""
+    from PIL import Image, ImageOps
+
+    with Image.open(src) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.width > width:
+            image.thumbnail((width, image.height))
+        if fmt == "jpeg" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        tmp = f"{dst}.{os.getpid()}.part"
+        image.save(tmp, format=fmt.upper(), quality=THUMB_QUALITY)
+    os.replace(tmp, dst)
+    return os.path.getsize(dst)
+
+
+class ThumbnailCache:
+    """
+    Disk cache s LRU izbacivanjem. Isti thumbnail koji traži više
+    istovremenih zahtjeva renderira se samo jednom.
+    """
+
+    def __init__(self, root: str = THUMB_CACHE_DIR, max_bytes: int = THUMB_CACHE_MAX_BYTES,
+                 workers: int = THUMB_WORKERS):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self._entries = OrderedDict()   # ime datoteke -> veličina, od najstarijeg
+        self._total = 0
+        self._inflight = {}
+        self._pool = None
+        self._lock = threading.Lock()
+
+        os.makedirs(root, exist_ok=True)
+        files = []
+        for name in os.listdir(root):
+            if name.endswith(".part"):
+                continue
+            stat = os.stat(os.path.join(root, name))
+            files.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._total += size
+
+    @staticmethod
+    def cache_name(src: str, width: int, fmt: str) -> str:
+        # putanja + mtime, pa zamijenjena slika na istoj putanji dobiva novi thumbnail
+        stat = os.stat(src)
+        digest = hashlib.sha1(f"{src}:{stat.st_mtime_ns}:{stat.st_size}".encode()).hexdigest()
+        return f"{digest}-{width}.{fmt}"
+
+    def _executor(self):
+        # pool se stvara tek kod prvog thumbnaila, ne kod importa aplikacije
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    async def get(self, src: str, width: int, fmt: str) -> str:
+        """Vraća putanju do thumbnaila, renderira ga ako ga nema u cacheu."""
+        name = self.cache_name(src, width, fmt)
+        if name in self._entries:
+            self._entries.move_to_end(name)
+            return os.path.join(self.root, name)
+
+        task = self._inflight.get(name)
+        if task is None:
+            task = asyncio.ensure_future(self._render(src, name, width, fmt))
+            self._inflight[name] = task
+            task.add_done_callback(lambda _: self._inflight.pop(name, None))
+        # shield: odustajanje jednog klijenta ne prekida render ostalima
+        return await asyncio.shield(task)
+
+    async def _render(self, src, name, width, fmt):
+        path = os.path.join(self.root, name)
+        size = await asyncio.get_running_loop().run_in_executor(
+            self._executor(), render_thumbnail, src, path, width, fmt
+        )
+        self._entries[name] = size
+        self._total += size
+        self._evict(keep=name)
+        return path
+
+    def _evict(self, keep):
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            name, size = next(iter(self._entries.items()))
+            if name == keep:
+                break
+            del self._entries[name]
+            self._total -= size
+            try:
+                os.remove(os.path.join(self.root, name))
+            except FileNotFoundError:
+                pass
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+thumbnail_cache = ThumbnailCache()
@@ -0,0 +1,45 @@
+import threading
+import time
+from collections import OrderedDict
+
+# ---------------------------
+# TTL CACHE
+# ---------------------------
+# Mali cache u memoriji procesa; koriste ga auth (tokeni i korisnici) i
+# pagination (COUNT za "total").
+
+
+class TTLCache:
+    """Mali thread-safe LRU cache u kojem svaki unos ima vlastiti rok trajanja."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
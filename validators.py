@@ -3,7 +3,15 @@ from fastapi import HTTPException
 ALLOWED_EXTENSIONS = {"jpg", "jpeg", "png", "webp"}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 
+# potpisi na početku datoteke -> ekstenzija pod kojom se slika sprema
+IMAGE_SIGNATURES = [
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+]
+
+
 def validate_upload_file(file):
+    # brza provjera prije čitanja; pravi tip i veličinu provjerava storage.save_upload
     if not file.filename:
         raise HTTPException(400, "Slika nije odabrana")
 
@@ -11,9 +19,12 @@ def validate_upload_file(file):
     if ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(400, "Dozvoljene su samo slike")
 
-    file.file.seek(0, 2)
-    size = file.file.tell()
-    file.file.seek(0)
 
-    if size > MAX_FILE_SIZE:
-        raise HTTPException(400, "Slika je prevelika (max 5MB)")
+def sniff_image_type(head: bytes):
+    """Vraća ekstenziju prema magic bytes (prvih 12 bajtova) ili None."""
+    for signature, ext in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import os
+
+from database import AsyncSessionLocal
+from metrics import WRITE_BATCH_SIZE
+
+# ---------------------------
+# GROUP COMMIT
+# ---------------------------
+# Na SQLite-u je svaki commit zaseban upis u WAL (i fsync), pa upisi iz više zahtjeva idu
+# kroz jedan writer task koji ih skuplja i commita zajedno: kad prođe
+# GROUP_COMMIT_MS milisekundi od prve operacije ili kad ih se skupi
+# GROUP_COMMIT_MAX_OPS. Svaka operacija ima svoj SAVEPOINT, pa greška u
+# jednoj (npr. "Already voted") ne ruši ostale u istoj grupi.
+GROUP_COMMIT_MS = float(os.getenv("GROUP_COMMIT_MS", "5"))
+GROUP_COMMIT_MAX_OPS = int(os.getenv("GROUP_COMMIT_MAX_OPS", "64"))
+
+_STOP = object()
+
+
+class WriteQueue:
+    def __init__(self, session_factory=AsyncSessionLocal,
+                 window_ms=GROUP_COMMIT_MS, max_ops=GROUP_COMMIT_MAX_OPS):
+        self.session_factory = session_factory
+        self.window = window_ms / 1000
+        self.max_ops = max_ops
+        self._queue = None
+        self._full = None
+        self._task = None
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._full = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Commita sve što je već u redu i gasi writer task."""
+        if not self.running:
+            return
+        self._queue.put_nowait(_STOP)
+        self._full.set()
+        await self._task
+        self._task = None
+
+    async def submit(self, op):
+        """
+        Izvršava `await op(db)` u sljedećoj grupi i vraća njegov rezultat
+        nakon commita. Iznimka iz op-a (npr. HTTPException) ili iz samog
+        commita se diže pozivatelju.
+        """
+        if not self.running:
+            # writer nije pokrenut (skripte, app bez startup eventa):
+            # operacija ide odmah, u vlastitoj transakciji
+            async with self.session_factory() as db:
+                result = await op(db)
+                await db.commit()
+                return result
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((op, future))
+        if self._queue.qsize() >= self.max_ops:
+            self._full.set()
+        return await future
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+
+            # pričekaj još operacija, osim ako je grupa već puna
+            if batch[0] is not _STOP and self._queue.qsize() + 1 < self.max_ops:
+                self._full.clear()
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.window)
+                except asyncio.TimeoutError:
+                    pass
+
+            while len(batch) < self.max_ops and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            stopping = any(item is _STOP for item in batch)
+            await self._commit([item for item in batch if item is not _STOP])
+            if stopping:
+                # ono što je stiglo nakon stop() ide bez grupiranja
+                while not self._queue.empty():
+                    item = self._queue.get_nowait()
+                    if item is not _STOP:
+                        await self._commit([item])
+                return
+
+    async def _commit(self, batch):
+        if not batch:
+            return
+        try:
+            await self._commit_batch(batch)
+        except BaseException as exc:
+            # npr. rollback ili zatvaranje sesije nakon pale konekcije: writer
+            # task mora preživjeti, a nitko iz grupe ne smije čekati zauvijek
+            for _, future in batch:
+                if future.done():
+                    continue
+                if isinstance(exc, Exception):
+                    future.set_exception(exc)
+                else:
+                    future.cancel()
+            if not isinstance(exc, Exception):
+                raise
+            logging.getLogger(__name__).exception("Write batch failed")
+
+    async def _commit_batch(self, batch):
+        done = []
+        async with self.session_factory() as db:
+            for op, future in batch:
+                if future.done():  # klijent je u međuvremenu odustao
+                    continue
+                try:
+                    async with db.begin_nested():
+                        result = await op(db)
+                except Exception as exc:
+                    if not future.done():
+                        future.set_exception(exc)
+                    continue
+                done.append((future, result))
+
+            try:
+                await db.commit()
+            except Exception as exc:
+                await db.rollback()
+                for future, _ in done:
+                    if not future.done():
+                        future.set_exception(exc)
+                return
+
+        WRITE_BATCH_SIZE.observe((), len(batch))
+        for future, result in done:
+            if not future.done():
+                future.set_result(result)
+
+
+write_queue = WriteQueue()